@@ -1,7 +1,15 @@
 from .exceptions import *  # noqa: F403, F401
 from .client import Http  # noqa: F403, F401
-from .struct import Options, Response  # noqa: F403, F401
+from .endpoint import Endpoint  # noqa: F403, F401
+from .struct import Options, Response, CompactResponse, Pool  # noqa: F403, F401
+from .retry import Retry, RetryBudget  # noqa: F403, F401
+from .limiter import RateLimiter, AdaptiveLimiter  # noqa: F403, F401
+from .cache import MemoryCache, FileCache  # noqa: F403, F401
+from .breaker import CircuitBreaker  # noqa: F403, F401
+from .balancer import Balancer  # noqa: F403, F401
+from .hedge import Hedge  # noqa: F403, F401
+from .metrics import Metrics  # noqa: F403, F401
 
-from . import multipart  # noqa: F403, F401
+from . import compression, multipart  # noqa: F403, F401
 
 from .__version__ import *  # noqa: F403, F401
@@ -0,0 +1,187 @@
+import asyncio
+import math
+import random
+import time
+from typing import Any, Dict, FrozenSet, Optional, Sequence, Tuple, Type
+
+import aiohttp
+
+from .exceptions import CircuitOpenError
+from .retry import IDEMPOTENT_METHODS
+
+ROUND_ROBIN = 'round_robin'
+LEAST_IN_FLIGHT = 'least_in_flight'
+# power of two random choices by peak EWMA latency multiplied by requests in flight
+P2C_EWMA = 'p2c_ewma'
+
+STRATEGIES = frozenset({ROUND_ROBIN, LEAST_IN_FLIGHT, P2C_EWMA})
+
+
+class Upstream:
+    """
+    One base url of Balancer with its load and health
+    """
+    __slots__ = ('url', 'in_flight', 'ewma', 'updated_at', 'failures', 'ejected_until', 'requests', 'errors')
+
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        # seconds to the response headers, 0 - not known yet, so new hosts are tried first
+        self.ewma = 0.0
+        self.updated_at = 0.0
+        # failures in a row
+        self.failures = 0
+        self.ejected_until = 0.0
+
+        self.requests = 0
+        self.errors = 0
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    @property
+    def cost(self) -> float:
+        return self.ewma * (self.in_flight + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'ewma': self.ewma,
+            'failures': self.failures,
+            'is_ejected': self.is_ejected(time.monotonic()),
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class Balancer:
+    """
+    Upstreams of one Http: the host of the request url is replaced with the picked upstream on every attempt,
+    so middlewares, cache and single flight see the first url, while breaker, rate limiter and metrics see the real one.
+    Middleware time of metrics is recorded under the first host, since no upstream is picked yet.
+
+        Http(host=['http://a:8080/api', 'http://b:8080/api'])
+        Http(balancer=Balancer([...], strategy=P2C_EWMA, eject_failures=3))
+
+    A host with `eject_failures` failures in a row is not picked for `eject_time` seconds,
+    at most `max_ejected` part of hosts is ejected at once; if all hosts are ejected they are used anyway.
+    Failed attempts of idempotent requests are sent again to another host right away, at most `failover` times,
+    every failover takes a token of Http.retry_budget as retries do.
+
+    :param hosts: base urls, the same as Http.host
+    :param strategy: ROUND_ROBIN, LEAST_IN_FLIGHT or P2C_EWMA
+    :param decay: seconds for EWMA latency to forget old values
+    :param statuses: response codes that are failures of the host
+    :param exceptions: errors that are failures of the host
+    """
+
+    def __init__(
+            self,
+            hosts: Sequence[str],
+            *,
+            strategy: str = ROUND_ROBIN,
+            decay: float = 10,
+            eject_failures: int = 5,
+            eject_time: float = 30,
+            max_ejected: float = 0.5,
+            failover: int = 1,
+            failover_methods: FrozenSet[str] = IDEMPOTENT_METHODS,
+            statuses: FrozenSet[int] = frozenset({502, 503, 504}),
+            exceptions: Tuple[Type[BaseException], ...] = (
+                    aiohttp.ClientConnectionError, asyncio.TimeoutError, CircuitOpenError,
+            ),
+    ):
+        if not hosts:
+            raise ValueError('at least one host is required')
+        if strategy not in STRATEGIES:
+            raise ValueError(f'unknown strategy {strategy}, one of {", ".join(sorted(STRATEGIES))}')
+
+        self.upstreams = [Upstream(host) for host in hosts]
+        self.strategy = strategy
+        self.decay = decay
+        self.eject_failures = eject_failures
+        self.eject_time = eject_time
+        self.max_ejected = max_ejected
+        self.failover = failover
+        self.failover_methods = failover_methods
+        self.statuses = statuses
+        self.exceptions = exceptions
+
+        self._next = 0
+
+    @property
+    def host(self) -> str:
+        # base url of requests before balancing
+        return self.upstreams[0].url
+
+    def url(self, upstream: Upstream, url: str) -> str:
+        host = self.host
+        if upstream.url == host or not url.startswith(host):
+            return url
+        return upstream.url + url[len(host):]
+
+    def is_failover_method(self, method: str) -> bool:
+        return self.failover > 0 and method.upper() in self.failover_methods
+
+    def pick(self, exclude: Sequence[Upstream] = ()) -> Optional[Upstream]:
+        """
+        Upstream for the next attempt, None if all hosts are excluded
+        """
+        now = time.monotonic()
+        candidates = [u for u in self.upstreams if u not in exclude]
+        if not candidates:
+            return None
+
+        healthy = [u for u in candidates if not u.is_ejected(now)]
+        if healthy:
+            candidates = healthy
+
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.strategy == ROUND_ROBIN:
+            upstream = candidates[self._next % len(candidates)]
+            self._next += 1
+            return upstream
+
+        if self.strategy == LEAST_IN_FLIGHT:
+            least = min(u.in_flight for u in candidates)
+            return random.choice([u for u in candidates if u.in_flight == least])
+
+        a, b = random.sample(candidates, 2)
+        return a if a.cost <= b.cost else b
+
+    def begin(self, upstream: Upstream):
+        upstream.in_flight += 1
+        upstream.requests += 1
+
+    def end(self, upstream: Upstream):
+        upstream.in_flight -= 1
+
+    def record(self, upstream: Upstream, seconds: float, is_failure: bool):
+        now = time.monotonic()
+        if upstream.updated_at:
+            w = math.exp(-(now - upstream.updated_at) / self.decay)
+            upstream.ewma = upstream.ewma * w + seconds * (1 - w)
+        # peak EWMA: slow responses are seen at once, recovery is gradual
+        if seconds > upstream.ewma:
+            upstream.ewma = seconds
+        upstream.updated_at = now
+
+        if not is_failure:
+            upstream.failures = 0
+            return
+
+        upstream.errors += 1
+        upstream.failures += 1
+        if upstream.failures >= self.eject_failures and not upstream.is_ejected(now):
+            ejected = sum(u.is_ejected(now) for u in self.upstreams)
+            if ejected + 1 <= len(self.upstreams) * self.max_ejected:
+                upstream.ejected_until = now + self.eject_time
+                upstream.failures = 0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        State of all upstreams, for dashboards
+        """
+        return {u.url: u.snapshot() for u in self.upstreams}
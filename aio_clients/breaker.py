@@ -0,0 +1,176 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, FrozenSet, Optional, Tuple, Type, Any
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .exceptions import CircuitOpenError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class Circuit:
+    """
+    State of one host, see CircuitBreaker
+    """
+
+    def __init__(self, breaker: 'CircuitBreaker', host: str):
+        self.breaker = breaker
+        self.host = host
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+
+        # (is_failure, is_slow) of the last `breaker.window` calls
+        self.calls: Deque[Tuple[bool, bool]] = deque(maxlen=breaker.window)
+        self.failures = 0
+        self.slow = 0
+
+        self.half_open_in_flight = 0
+        self.half_open_success = 0
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / len(self.calls) if self.calls else 0.0
+
+    @property
+    def slow_rate(self) -> float:
+        return self.slow / len(self.calls) if self.calls else 0.0
+
+    def _reset(self):
+        self.calls.clear()
+        self.failures = self.slow = 0
+        self.half_open_in_flight = self.half_open_success = 0
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self._reset()
+
+    def before(self):
+        """
+        Called before request, raises CircuitOpenError to fail fast
+        """
+        if self.state == CLOSED:
+            return
+
+        now = time.monotonic()
+        if self.state == OPEN:
+            retry_after = self.opened_at + self.breaker.open_timeout - now
+            if retry_after > 0:
+                raise CircuitOpenError(self.host, retry_after)
+            self.state = HALF_OPEN
+
+        # half open: only a few trial requests at once
+        if self.half_open_in_flight + self.half_open_success >= self.breaker.half_open_calls:
+            raise CircuitOpenError(self.host, 0)
+        self.half_open_in_flight += 1
+
+    def record(self, duration: float, is_failure: bool):
+        is_slow = self.breaker.slow_call is not None and duration >= self.breaker.slow_call
+        now = time.monotonic()
+
+        if self.state == HALF_OPEN:
+            self.half_open_in_flight = max(0, self.half_open_in_flight - 1)
+            if is_failure or is_slow:
+                self._open(now)
+            else:
+                self.half_open_success += 1
+                if self.half_open_success >= self.breaker.half_open_calls:
+                    self.state = CLOSED
+                    self._reset()
+            return
+
+        if self.state == OPEN:
+            # request was sent before the breaker opened
+            return
+
+        if len(self.calls) == self.calls.maxlen:
+            old_failure, old_slow = self.calls[0]
+            self.failures -= old_failure
+            self.slow -= old_slow
+        self.calls.append((is_failure, is_slow))
+        self.failures += is_failure
+        self.slow += is_slow
+
+        if len(self.calls) < self.breaker.min_calls:
+            return
+        if self.failure_rate >= self.breaker.failure_rate or (
+                self.breaker.slow_call is not None and self.slow_rate >= self.breaker.slow_rate
+        ):
+            self._open(now)
+
+    def cancel(self):
+        """
+        Request was cancelled, there is no result
+        """
+        if self.state == HALF_OPEN:
+            self.half_open_in_flight = max(0, self.half_open_in_flight - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'calls': len(self.calls),
+            'failure_rate': self.failure_rate,
+            'slow_rate': self.slow_rate,
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per host for Http: when too many of the last `window` calls failed or were slow,
+    the host is open and requests fail fast with CircuitOpenError for `open_timeout` seconds,
+    then `half_open_calls` trial requests decide if it is closed again.
+
+    :param window: size of sliding window of calls
+    :param min_calls: calls in the window before rates are checked
+    :param failure_rate: rate of failed calls to open the circuit
+    :param slow_call: seconds to the response headers after which the call is slow, None - don't track
+    :param slow_rate: rate of slow calls to open the circuit
+    :param statuses: response codes that are failures
+    :param exceptions: errors that are failures
+    """
+
+    def __init__(
+            self, *,
+            window: int = 100,
+            min_calls: int = 20,
+            failure_rate: float = 0.5,
+            slow_call: Optional[float] = None,
+            slow_rate: float = 0.8,
+            open_timeout: float = 30,
+            half_open_calls: int = 5,
+            statuses: FrozenSet[int] = frozenset(range(500, 600)),
+            exceptions: Tuple[Type[BaseException], ...] = (aiohttp.ClientError, asyncio.TimeoutError),
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+        self.statuses = statuses
+        self.exceptions = exceptions
+
+        self._circuits: Dict[str, Circuit] = {}
+
+    def circuit(self, url: str) -> Circuit:
+        host = urlsplit(url).netloc
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = Circuit(self, host)
+        return circuit
+
+    def state(self, url: str) -> str:
+        return self.circuit(url).state
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        State of all hosts, for dashboards
+        """
+        return {host: circuit.snapshot() for host, circuit in self._circuits.items()}
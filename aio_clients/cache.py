@@ -0,0 +1,326 @@
+import abc
+import asyncio
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple, Mapping
+from urllib.parse import urlencode
+
+from aiohttp import ClientResponse
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from .struct import Options, Response
+from .types import Q_PARAMS_TYPE
+
+# responses that are stored, heuristically cacheable ones of RFC 9111 4.2.2,
+# partial (206) and not modified (304) answers are never stored as bodies
+CACHEABLE_STATUSES = frozenset({200, 203, 300, 301, 308, 404, 410})
+# Cache-Control directives that let a shared cache store a response to a request with Authorization
+AUTHORIZED_DIRECTIVES = frozenset({'public', 'must-revalidate', 's-maxage'})
+
+
+# requests that ask for a part or a conditional answer, their responses are not full bodies for everyone
+_PARTIAL_REQUEST_HEADERS = frozenset({
+    'range', 'if-range', 'if-match', 'if-none-match', 'if-modified-since', 'if-unmodified-since',
+})
+
+
+def is_cacheable_request(headers: Mapping[str, str]) -> bool:
+    return not any(name.lower() in _PARTIAL_REQUEST_HEADERS for name in headers)
+
+
+def cache_key(method: str, url: str, query_params: Q_PARAMS_TYPE = None) -> str:
+    if query_params:
+        url = '{}{}{}'.format(url, '&' if '?' in url else '?', urlencode(query_params))
+    return '{} {}'.format(method.upper(), url)
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for item in value.split(','):
+        name, _, arg = item.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def expires_at(code: int, headers: Mapping[str, str], now: float) -> Optional[float]:
+    """
+    Time until the response is fresh, `now` for responses that must be revalidated on every use,
+    None if the response can't be stored: only full final responses are, not 206 or 304
+    """
+    if code not in CACHEABLE_STATUSES:
+        return None
+
+    cache_control = _parse_cache_control(headers.get('Cache-Control', ''))
+    # the cache is shared by all requests of Http, private responses are for one user
+    if 'no-store' in cache_control or 'private' in cache_control or headers.get('Vary', '').strip() == '*':
+        return None
+
+    has_validator = 'ETag' in headers or 'Last-Modified' in headers
+    if 'no-cache' in cache_control:
+        return now if has_validator else None
+
+    age = headers.get('Age', '')
+    age_seconds = int(age) if age.isdigit() else 0
+
+    max_age = cache_control.get('s-maxage') or cache_control.get('max-age')
+    if max_age is not None and max_age.isdigit():
+        return now + int(max_age) - age_seconds
+
+    expires = _parse_date(headers.get('Expires'))
+    if 'Expires' in headers:
+        # invalid Expires (like 0) means already expired
+        date = _parse_date(headers.get('Date')) or now
+        return now + (expires - date) if expires is not None else now
+
+    if has_validator:
+        return now
+    return None
+
+
+@dataclass
+class CacheEntry:
+    code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    expires_at: float
+
+    # request header values the response varies on
+    vary: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    # parsed json, only with BaseCache(is_store_json=True)
+    is_json: bool = False
+    json: Any = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self._header('ETag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self._header('Last-Modified')
+
+    def _header(self, name: str) -> Optional[str]:
+        name = name.lower()
+        for k, v in self.headers:
+            if k.lower() == name:
+                return v
+        return None
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.expires_at
+
+    def is_match(self, request_headers: Mapping[str, str]) -> bool:
+        if not self.vary:
+            return True
+        headers = CIMultiDict(request_headers)
+        return all(headers.get(k) == v for k, v in self.vary.items())
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def refresh(self, headers: Mapping[str, str], now: Optional[float] = None) -> bool:
+        """
+        Update entry with headers of 304 response, False if it can't be stored anymore
+        """
+        now = now or time.time()
+        merged = CIMultiDict(self.headers)
+        for k, v in headers.items():
+            # 304 has no body, its content headers are not for the stored body
+            if k.lower() not in ('content-length', 'content-encoding', 'transfer-encoding'):
+                merged[k] = v
+
+        expires = expires_at(self.code, merged, now)
+        if expires is None:
+            return False
+
+        self.headers = list(merged.items())
+        self.expires_at = expires
+        return True
+
+    def to_response(self, option: Options, response: Optional[ClientResponse] = None) -> Response:
+        res = Response(
+            code=self.code,
+            headers=CIMultiDictProxy(CIMultiDict(self.headers)),
+            option=option,
+            response=response,
+            body=self.body,
+            is_cached=True,
+        )
+        if self.is_json:
+            res.json = self.json
+        return res
+
+    @classmethod
+    def from_response(
+            cls,
+            res: Response,
+            request_headers: Mapping[str, str],
+            now: Optional[float] = None,
+    ) -> Optional['CacheEntry']:
+        if not isinstance(res.body, bytes):
+            return None
+
+        headers = CIMultiDict(request_headers)
+        if 'Authorization' in headers:
+            # RFC 9111 3.5: responses to authorized requests are stored only if the server allows it explicitly
+            cache_control = _parse_cache_control(res.headers.get('Cache-Control', ''))
+            if not AUTHORIZED_DIRECTIVES.intersection(cache_control):
+                return None
+
+        expires = expires_at(res.code, res.headers, now or time.time())
+        if expires is None:
+            return None
+
+        vary: Dict[str, Optional[str]] = {}
+        for name in res.headers.get('Vary', '').split(','):
+            name = name.strip().lower()
+            if name:
+                vary[name] = headers.get(name)
+
+        return cls(code=res.code, headers=list(res.headers.items()), body=res.body, expires_at=expires, vary=vary)
+
+
+class BaseCache(abc.ABC):
+    """
+    Storage of Http response cache, it is shared: private responses and responses to requests with Authorization
+    are not stored unless the server allows it
+
+    :param is_store_json: store parsed json of the response too, so cache hits are not decoded again
+    """
+
+    def __init__(self, *, is_store_json: bool = False):
+        self.is_store_json = is_store_json
+
+        self.hits = 0
+        self.misses = 0
+        # failed writes, the request is not failed by them
+        self.errors = 0
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        pass
+
+    @abc.abstractmethod
+    async def set(self, key: str, entry: CacheEntry):
+        pass
+
+    @abc.abstractmethod
+    async def delete(self, key: str):
+        pass
+
+
+class MemoryCache(BaseCache):
+    """
+    LRU cache in memory, limited by count of entries and size of bodies
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 2 ** 20, *, is_store_json: bool = False):
+        super().__init__(is_store_json=is_store_json)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.size = 0
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry):
+        await self.delete(key)
+        if entry.size > self.max_bytes:
+            return
+
+        self._entries[key] = entry
+        self.size += entry.size
+
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.size -= old.size
+
+    async def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+
+class FileCache(BaseCache):
+    """
+    Cache on disk, an entry is a pickle file in `directory`, files are read and written in the default executor
+    """
+
+    def __init__(self, directory: str, *, is_store_json: bool = False):
+        super().__init__(is_store_json=is_store_json)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def _read(self, key: str) -> Optional[CacheEntry]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+
+    def _write(self, key: str, entry: CacheEntry):
+        # unique tmp file: concurrent writes of the same key run in different threads
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _remove(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, key)
+
+    async def set(self, key: str, entry: CacheEntry):
+        await asyncio.get_running_loop().run_in_executor(None, self._write, key, entry)
+
+    async def delete(self, key: str):
+        await asyncio.get_running_loop().run_in_executor(None, self._remove, key)
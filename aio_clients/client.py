@@ -1,40 +1,92 @@
 import asyncio
-import copy
-from typing import Dict, Any, Optional
+import functools
+import io
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import (
+    Dict, Any, Optional, Tuple, AsyncIterator, Hashable, Union, Iterable, AsyncIterable, Deque, List, Callable,
+    Awaitable,
+)
 
 import aiohttp
 
-from . import multipart
-from .struct import Response, Options, Middleware
+from . import compression, jsonlib, multipart
+from .balancer import Balancer, Upstream
+from .breaker import CircuitBreaker
+from .cache import BaseCache, CacheEntry, cache_key, is_cacheable_request
+from .download import DEST_TYPE, Downloader, DownloadResult
+from .endpoint import Endpoint
+from .hedge import LatencyWindow
+from .limiter import AdaptiveLimiter, RateLimiter
+from .metrics import Metrics
+from .retry import RetryBudget, parse_retry_after
+from .session import registry, session_key
+from .struct import Response, Options, Middleware, PoolStats, HostPoolStats, BatchItem
 from .types import Q_PARAMS_TYPE
 
+SINGLE_FLIGHT_METHODS = frozenset({'GET', 'HEAD'})
+
 
 class Http:
     def __init__(
             self, *,
-            host='',
+            host: Union[str, List[str]] = '',
             headers=None,
             option: Optional[Options] = None,
-            middleware: Optional[Middleware] = None
+            middleware: Optional[Middleware] = None,
+            retry_budget: Optional[RetryBudget] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            cache: Optional[BaseCache] = None,
+            is_single_flight: bool = False,
+            breaker: Optional[CircuitBreaker] = None,
+            hedge_budget: Optional[RetryBudget] = None,
+            metrics: Optional[Metrics] = None,
+            balancer: Optional[Balancer] = None,
+            concurrency_limiter: Optional[AdaptiveLimiter] = None,
     ):
-        loop = asyncio.get_event_loop()
-        self.host = host
+        # several hosts are balanced, requests are built with the first one and sent to the picked one
+        if balancer is None and isinstance(host, (list, tuple)):
+            balancer = Balancer(host)
+        self.balancer = balancer
+        self.host: str = balancer.host if balancer is not None else host  # type: ignore
         self.base_option = option or Options()
+        # shared by all requests with Options.retry
+        self.retry_budget = retry_budget or RetryBudget()
+        self.rate_limiter = rate_limiter
+        # GET responses are cached with respect to Cache-Control, Expires, ETag and Last-Modified
+        self.cache = cache
+        # concurrent identical GET/HEAD requests share one request to the server
+        self.is_single_flight = is_single_flight
+        # fail fast with CircuitOpenError while the host is unhealthy
+        self.breaker = breaker
+        # extra requests of Options.hedge, by default at most 10% of hedged requests
+        self.hedge_budget = hedge_budget or RetryBudget(ratio=0.1, min_per_second=0, max_tokens=10)
+        # latency of hedged requests, source of Hedge(delay=None)
+        self.latency = LatencyWindow()
+        # latency, throughput and errors per host and method, dns and connect time only for sessions created after it
+        self.metrics = metrics
+        # requests in flight, the limit follows latency, excess requests wait or fail with LoadShedError
+        self.concurrency_limiter = concurrency_limiter
+        if metrics is not None and concurrency_limiter is not None:
+            metrics.gauge('concurrency_limit', lambda: int(concurrency_limiter.limit))  # type: ignore
+            metrics.gauge('concurrency_in_flight', lambda: concurrency_limiter.in_flight)  # type: ignore
+            metrics.gauge('concurrency_queued', lambda: concurrency_limiter.queued)  # type: ignore
+            metrics.gauge('concurrency_shed', lambda: concurrency_limiter.shed)  # type: ignore
 
-        session_params = {}
-        if self.base_option.trace_config:
-            session_params['trace_configs'] = [
-                self.base_option.trace_config
-            ]
-
-        if self.base_option.session_kwargs:
-            session_params.update(self.base_option.session_kwargs)
+        # sessions are created on first use, one per event loop
+        self._sessions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopSession]' = \
+            weakref.WeakKeyDictionary()
+        self._sessions_lock = threading.Lock()
 
-        self.session = aiohttp.ClientSession(
-            loop=loop,
-            timeout=self.base_option.timeout,
-            **session_params,  # type: ignore
-        )
+        self._session_key: Optional[Hashable] = None
+        if self.base_option.is_shared_session:
+            # a session without the trace config of metrics records no dns, connect and bytes
+            self._session_key = session_key(
+                self.base_option, (metrics.trace_config,) if metrics is not None else (),
+            )
 
         self.headers = headers
         if headers is None:
@@ -46,35 +98,508 @@ class Http:
         if middleware:
             self._middleware_start_list = middleware.start or []
             self._middleware_end_list = middleware.end or []
+            self._middleware_around_list = middleware.around or []
         else:
             self._middleware_start_list = []
             self._middleware_end_list = []
+            self._middleware_around_list = []
+
+        self._middleware_start_steps = _steps(self._middleware_start_list)
+        self._middleware_end_steps = _steps(self._middleware_end_list)
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        session_params: Dict[str, Any] = {}
+        trace_configs = []
+        if self.base_option.trace_config:
+            trace_configs.append(self.base_option.trace_config)
+        if self.metrics is not None:
+            trace_configs.append(self.metrics.trace_config)
+        if trace_configs:
+            session_params['trace_configs'] = trace_configs
+
+        if self.base_option.pool:
+            session_params['connector'] = self.base_option.pool.connector()
+
+        if self.base_option.session_kwargs:
+            session_params.update(self.base_option.session_kwargs)
+
+        return aiohttp.ClientSession(
+            timeout=self.base_option.timeout,
+            **session_params,  # type: ignore
+        )
+
+    def _loop_session(self) -> '_LoopSession':
+        loop = asyncio.get_running_loop()
+
+        state = self._sessions.get(loop)
+        if state is None:
+            # Http can be shared between threads, each with its own loop
+            with self._sessions_lock:
+                state = self._sessions.get(loop)
+                if state is None:
+                    if self._session_key is not None:
+                        session = registry.acquire(loop, self._session_key, self._new_session)
+                    else:
+                        session = self._new_session()
+                    state = self._sessions[loop] = _LoopSession(session)
+        return state
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Session of the running event loop, created on first access
+        """
+        return self._loop_session().session
+
+    async def __aenter__(self) -> 'Http':
+        self._loop_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _call_middleware(self, m: Any, **kwargs) -> Any:
+        if self.metrics is None:
+            return await m(**kwargs)
+
+        start = time.perf_counter()
+        try:
+            return await m(**kwargs)
+        finally:
+            self.metrics.record_middleware(_name(m), time.perf_counter() - start)
+
+    async def _run_middleware(
+            self, steps: List[List[Any]], *, is_short_circuit: bool = False, **kwargs
+    ) -> Optional[Response]:
+        # middlewares run in order, adjacent concurrent ones together,
+        # with is_short_circuit the first returned Response stops the chain
+        for step in steps:
+            if len(step) == 1:
+                res = await self._call_middleware(step[0], **kwargs)
+                if is_short_circuit and isinstance(res, Response):
+                    return res
+                continue
+
+            for res in await asyncio.gather(*(self._call_middleware(m, **kwargs) for m in step)):
+                if is_short_circuit and isinstance(res, Response):
+                    return res
+        return None
 
     async def middleware_start(
             self, *,
             headers: Optional[Dict[str, str]] = None,
             request_kwargs: Optional[Dict[str, Any]] = None,
             **kwargs
-    ):
-        for m in self._middleware_start_list:
-            await m(
-                headers=headers,
-                request_kwargs=request_kwargs,
-                **kwargs
-            )
+    ) -> Optional[Response]:
+        """
+        Run start middlewares, returns Response of the middleware that answered instead of the server
+        """
+        return await self._run_middleware(
+            self._middleware_start_steps,
+            is_short_circuit=True,
+            headers=headers,
+            request_kwargs=request_kwargs,
+            **kwargs
+        )
 
     async def middleware_end(
             self, *,
             response: Response,
             **kwargs
     ):
-        for m in self._middleware_end_list:
-            await m(
-                response=response,
-                **kwargs
+        # all end middlewares run, returned values are ignored
+        await self._run_middleware(
+            self._middleware_end_steps,
+            response=response,
+            **kwargs
+        )
+
+    async def _middleware_around(
+            self,
+            call: Callable[[], Awaitable[Response]],
+            **kwargs
+    ) -> Response:
+        for m in reversed(self._middleware_around_list):
+            call = functools.partial(self._call_around, m, call, kwargs)
+        return await call()
+
+    async def _call_around(
+            self,
+            m: Any,
+            call_next: Callable[[], Awaitable[Response]],
+            kwargs: Dict[str, Any],
+    ) -> Response:
+        metrics = self.metrics
+        if metrics is None:
+            return await m(call_next, **kwargs)
+
+        inner = 0.0
+
+        async def timed_next() -> Response:
+            nonlocal inner
+            start = time.perf_counter()
+            try:
+                return await call_next()
+            finally:
+                inner += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            return await m(timed_next, **kwargs)
+        finally:
+            metrics.record_middleware(_name(m), time.perf_counter() - start - inner)
+
+    def _prepare(
+            self, *,
+            path: Optional[str],
+            headers: Optional[Dict[str, str]],
+            query_params: Q_PARAMS_TYPE,
+            json: Optional[Any],
+            data: Optional[Any],
+            form: Optional[multipart.Easy],
+            option: Options,
+            json_body: Optional[bytes] = None,
+    ) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        if path:
+            url = '{}{}'.format(self.host, path)
+        else:
+            url = self.host
+
+        # headers are flat str -> str, shallow copy is enough and middleware can change it in place
+        if headers:
+            main_headers = {**self.headers, **headers}
+        else:
+            main_headers = self.headers.copy()
+
+        r = self._prepare_kwargs(
+            main_headers,
+            query_params=query_params, json=json, data=data, form=form, option=option, json_body=json_body,
+        )
+        return url, main_headers, r
+
+    @staticmethod
+    def _prepare_kwargs(
+            headers: Dict[str, str], *,
+            query_params: Q_PARAMS_TYPE,
+            json: Optional[Any],
+            data: Optional[Any],
+            form: Optional[multipart.Easy],
+            option: Options,
+            json_body: Optional[bytes] = None,
+    ) -> Dict[str, Any]:
+        # kwargs of aiohttp request, headers of the body are set in place
+        r: Dict[str, Any] = {}
+        if json:
+            if data or form:
+                raise ValueError('data and json parameters can not be used at the same time')
+            r['data'] = _JsonPayload(json_body if json_body is not None else jsonlib.to_bytes(option.json_dumps(json)))
+        if data or form:
+            r['data'] = data or form
+        if query_params:
+            r['params'] = query_params
+        r.update(option.request_base())
+
+        if data and 'Content-Type' in headers:
+            del headers['Content-Type']
+
+        if form:
+            headers.update(form.headers)
+
+        if option.accept_encoding and 'Accept-Encoding' not in headers:
+            headers['Accept-Encoding'] = option.accept_encoding
+
+        return r
+
+    async def _compress(self, request_kwargs: Dict[str, Any], headers: Dict[str, str], encoding: str, option: Options):
+        # compress the body in place, forms and streams are sent as is
+        data = request_kwargs.get('data')
+        if isinstance(data, _JsonPayload):
+            body, content_type = data.body, data.content_type
+        elif isinstance(data, (bytes, bytearray)):
+            body, content_type = data, 'application/octet-stream'  # type: ignore
+        elif isinstance(data, str):
+            body, content_type = data.encode(), 'text/plain; charset=utf-8'
+        else:
+            return
+
+        if len(body) < option.compress_min_size or 'Content-Encoding' in headers:
+            return
+
+        if len(body) >= option.compress_executor_size:
+            body = await asyncio.get_running_loop().run_in_executor(
+                option.executor, compression.compress, encoding, body, option.compress_level,
+            )
+        else:
+            body = compression.compress(encoding, body, option.compress_level)
+
+        request_kwargs['data'] = aiohttp.BytesPayload(body, content_type=content_type)
+        headers['Content-Encoding'] = encoding
+
+    @staticmethod
+    async def _dumps(json: Any, option: Options) -> Optional[bytes]:
+        # request json encoded off the event loop, None - nothing to encode
+        if not json:
+            return None
+        return jsonlib.to_bytes(
+            await asyncio.get_running_loop().run_in_executor(option.executor, option.json_dumps, json),
+        )
+
+    @staticmethod
+    async def _decompress(encoding: str, body: bytes, option: Options) -> bytes:
+        if len(body) >= option.compress_executor_size:
+            return await asyncio.get_running_loop().run_in_executor(
+                option.executor, compression.decompress, encoding, body,
             )
+        return compression.decompress(encoding, body)
 
-    async def request(  # noqa: C901
+    @asynccontextmanager
+    async def _send(
+            self, *,
+            method: str,
+            url: str,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+            option: Options,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        state = self._loop_session()
+        state.in_flight += 1
+        try:
+            async with self._retry(
+                    session=state.session,
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    request_kwargs=request_kwargs,
+                    option=option,
+            ) as response:
+                yield response
+        finally:
+            state.in_flight -= 1
+            # don't close the session under other coroutines that are still in flight
+            if option.is_close_session and not state.in_flight:
+                await self.close()
+
+    @asynccontextmanager
+    async def _attempt(
+            self, *,
+            session: aiohttp.ClientSession,
+            method: str,
+            url: str,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        # one network attempt, retries are made by _retry
+        breaker = self.breaker
+        circuit = breaker.circuit(url) if breaker is not None else None
+        if circuit is not None:
+            circuit.before()
+
+        metrics = self.metrics
+        limiter = self.concurrency_limiter
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(url)
+            if limiter is not None:
+                await limiter.acquire()
+        except BaseException:
+            # the trial slot of a half open circuit is not used
+            if circuit is not None:
+                circuit.cancel()
+            raise
+
+        if circuit is None and metrics is None and limiter is None:
+            async with session.request(method=method, url=url, headers=headers, **request_kwargs) as response:
+                yield response
+            return
+
+        attempt = None
+        if metrics is not None:
+            attempt = metrics.begin(method, url)
+            if 'trace_request_ctx' not in request_kwargs:
+                # dns and connect time are recorded by Metrics.trace_config
+                request_kwargs = {**request_kwargs, 'trace_request_ctx': attempt}
+
+        error: Optional[BaseException] = None
+        is_recorded = False
+        start = time.monotonic()
+        try:
+            async with session.request(method=method, url=url, headers=headers, **request_kwargs) as response:
+                is_recorded = True
+                if circuit is not None:
+                    circuit.record(time.monotonic() - start, response.status in breaker.statuses)  # type: ignore
+                if limiter is not None:
+                    limiter.record(time.monotonic() - start, response.status in limiter.statuses)
+                if attempt is not None:
+                    metrics.headers(attempt, response.status)  # type: ignore
+                yield response
+        except BaseException as e:
+            is_failed = isinstance(e, Exception) and not isinstance(e, asyncio.CancelledError)
+            if is_failed:
+                error = e
+            if circuit is not None and not is_recorded:
+                if is_failed:
+                    circuit.record(time.monotonic() - start, isinstance(e, breaker.exceptions))  # type: ignore
+                else:
+                    circuit.cancel()
+            if limiter is not None and not is_recorded and isinstance(e, limiter.exceptions):
+                limiter.record(time.monotonic() - start, True)
+            raise
+        finally:
+            if limiter is not None:
+                limiter.release()
+            if attempt is not None:
+                metrics.end(attempt, error)  # type: ignore
+
+    @asynccontextmanager
+    async def _retry(
+            self, *,
+            session: aiohttp.ClientSession,
+            method: str,
+            url: str,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+            option: Options,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        if self.balancer is not None:
+            async with self._balanced(
+                    session=session, method=method, url=url, headers=headers, request_kwargs=request_kwargs,
+                    option=option,
+            ) as response:
+                yield response
+            return
+
+        retry = option.retry
+        if retry is None or not retry.is_retryable_method(method) or not _is_replayable(request_kwargs.get('data')):
+            async with self._attempt(
+                    session=session, method=method, url=url, headers=headers, request_kwargs=request_kwargs,
+            ) as response:
+                yield response
+            return
+
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            is_yielded = False
+            try:
+                async with self._attempt(
+                        session=session, method=method, url=url, headers=headers, request_kwargs=request_kwargs,
+                ) as response:
+                    if (
+                            response.status not in retry.statuses
+                            or attempt >= retry.attempts
+                            or not self.retry_budget.withdraw()
+                    ):
+                        is_yielded = True
+                        yield response
+                        return
+
+                    delay = retry.delay(attempt, parse_retry_after(response.headers.get('Retry-After')))
+            except Exception as e:
+                # errors from the caller's block are not retried
+                if (
+                        is_yielded
+                        or attempt >= retry.attempts
+                        or not retry.is_retryable_exception(e)
+                        or not self.retry_budget.withdraw()
+                ):
+                    raise
+                delay = retry.delay(attempt)
+
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def _balanced(
+            self, *,
+            session: aiohttp.ClientSession,
+            method: str,
+            url: str,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+            option: Options,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        # _retry over upstreams of the balancer: every attempt goes to a host that was not tried yet if possible,
+        # failed idempotent requests are sent again to another host without delay
+        balancer: Balancer = self.balancer  # type: ignore
+        is_replayable = _is_replayable(request_kwargs.get('data'))
+        retry = option.retry
+        if retry is not None and not (retry.is_retryable_method(method) and is_replayable):
+            retry = None
+        is_failover = is_replayable and balancer.is_failover_method(method)
+        if retry is not None or is_failover:
+            self.retry_budget.deposit()
+
+        tried: List[Upstream] = []
+        upstream: Upstream = balancer.pick()  # type: ignore
+        attempt = failovers = 0
+
+        def next_attempt(
+                status: Optional[int] = None,
+                error: Optional[Exception] = None,
+                retry_after: Optional[float] = None,
+        ) -> Optional[Tuple[float, Upstream, bool]]:
+            # delay, upstream and if it is a failover, None - the result of the attempt is final
+            is_retry = retry is not None and attempt < retry.attempts and (
+                status in retry.statuses if error is None else retry.is_retryable_exception(error)
+            )
+            is_host_failure = status in balancer.statuses if error is None else isinstance(error, balancer.exceptions)
+
+            # pick moves round robin forward, it is called only when there is a next attempt
+            if is_retry:
+                other = balancer.pick(tried) or balancer.pick()
+                result = (retry.delay(attempt, retry_after), other, False)  # type: ignore
+            elif is_failover and is_host_failure and failovers < balancer.failover:
+                other = balancer.pick(tried)
+                if other is None:
+                    return None
+                result = (0.0, other, True)
+            else:
+                return None
+
+            if not self.retry_budget.withdraw():
+                return None
+            return result  # type: ignore
+
+        while True:
+            attempt += 1
+            tried.append(upstream)
+            is_yielded = is_recorded = False
+
+            balancer.begin(upstream)
+            start = time.monotonic()
+            try:
+                async with self._attempt(
+                        session=session, method=method, url=balancer.url(upstream, url), headers=headers,
+                        request_kwargs=request_kwargs,
+                ) as response:
+                    balancer.record(upstream, time.monotonic() - start, response.status in balancer.statuses)
+                    is_recorded = True
+
+                    step = next_attempt(
+                        status=response.status, retry_after=parse_retry_after(response.headers.get('Retry-After')),
+                    )
+                    if step is None:
+                        is_yielded = True
+                        yield response
+                        return
+            except Exception as e:
+                if not is_recorded:
+                    balancer.record(upstream, time.monotonic() - start, isinstance(e, balancer.exceptions))
+                # errors from the caller's block are not retried
+                if is_yielded:
+                    raise
+                step = next_attempt(error=e)
+                if step is None:
+                    raise
+            finally:
+                balancer.end(upstream)
+
+            delay, upstream, is_failover_step = step
+            failovers += is_failover_step
+            if delay:
+                await asyncio.sleep(delay)
+
+    async def request(
             self,
             *,
             method: str,
@@ -91,65 +616,362 @@ class Http:
         if not option:
             option = self.base_option
 
-        r = {}
-        if json:
-            r['json'] = json
-        if data or form:
-            r['data'] = data or form
-        if query_params:
-            r['params'] = query_params
+        if (
+                self.is_single_flight
+                and json is None and data is None and form is None
+                and method.upper() in SINGLE_FLIGHT_METHODS
+        ):
+            return await self._single_flight(
+                method=method, path=path, headers=headers, query_params=query_params, option=option,
+            )
 
-        if option.timeout:
-            r['timeout'] = option.timeout
-        if option.is_ssl is not None:
-            r['ssl'] = option.is_ssl
-        if option.request_kwargs:
-            r.update(option.request_kwargs)
+        return await self._request(
+            method=method, path=path, headers=headers, query_params=query_params,
+            json=json, data=data, form=form, option=option,
+        )
 
-        if path:
-            url = '{}{}'.format(self.host, path)
-        else:
-            url = self.host
+    async def _single_flight(
+            self, *,
+            method: str,
+            path: Optional[str],
+            headers: Optional[Dict[str, str]],
+            query_params: Q_PARAMS_TYPE,
+            option: Options,
+    ) -> Response:
+        # identical requests in flight share one request and get the same Response
+        key = (
+            method.upper(),
+            path,
+            cache_key(method, '', query_params),
+            tuple(sorted(headers.items())) if headers else (),
+            id(option),
+        )
 
-        main_headers = copy.deepcopy(self.headers)
-        if headers:
-            main_headers.update(headers)
-        if data and 'Content-Type' in main_headers:
-            del main_headers['Content-Type']
+        flights = self._loop_session().flights
+        task = flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request(
+                method=method, path=path, headers=headers, query_params=query_params,
+                json=None, data=None, form=None, option=option,
+            ))
+            flights[key] = task
 
-        if form:
-            main_headers.update(form.headers)
+            def done(t: 'asyncio.Future[Response]'):
+                if flights.get(key) is t:
+                    del flights[key]
+                if not t.cancelled():
+                    # all callers can be cancelled, don't warn about not retrieved exception
+                    t.exception()
+
+            task.add_done_callback(done)
+
+        # cancel of one caller must not cancel the request of others
+        return await asyncio.shield(task)
+
+    async def _request(
+            self, *,
+            method: str,
+            path: Optional[str],
+            headers: Optional[Dict[str, str]],
+            query_params: Q_PARAMS_TYPE,
+            json: Optional[Any],
+            data: Optional[Any],
+            form: Optional[multipart.Easy],
+            option: Options,
+    ) -> Response:
+        json_body = await self._dumps(json, option) if option.is_json_dumps_in_executor else None
+        url, main_headers, r = self._prepare(
+            path=path, headers=headers, query_params=query_params,
+            json=json, data=data, form=form, option=option, json_body=json_body,
+        )
+        return await self._dispatch(
+            method=method, url=url, query_params=query_params, headers=main_headers, request_kwargs=r, option=option,
+        )
 
-        await self.middleware_start(
+    async def _dispatch(
+            self, *,
+            method: str,
+            url: str,
+            query_params: Q_PARAMS_TYPE,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+            option: Options,
+    ) -> Response:
+        # prepared request through compression, middlewares, cache and the network
+        main_headers, r = headers, request_kwargs
+        if option.compress is not None:
+            await self._compress(r, main_headers, option.compress, option)
+
+        # middlewares run before an upstream is picked, their time goes to the first host of Balancer
+        endpoint = self.metrics.endpoint(method, url) if self.metrics is not None else None
+        start = time.perf_counter()
+        res = await self.middleware_start(
             headers=main_headers,
             request_kwargs=r
         )
+        middleware_time = time.perf_counter() - start
 
-        try:
-            async with self.session.request(
-                    method=method,
-                    url=url,
-                    headers=main_headers,
-                    **r,
-            ) as response:
-                res = Response(
-                    response=response,
-                    code=response.status,
-                    headers=response.headers,
-                    option=option,
-                    body=await response.read()
+        if res is None:
+            if self._middleware_around_list:
+                res = await self._middleware_around(
+                    functools.partial(
+                        self._exchange,
+                        method=method, url=url, query_params=query_params, headers=main_headers,
+                        request_kwargs=r, option=option,
+                    ),
+                    method=method, url=url, headers=main_headers, request_kwargs=r,
+                )
+            else:
+                res = await self._exchange(
+                    method=method, url=url, query_params=query_params, headers=main_headers,
+                    request_kwargs=r, option=option,
                 )
-                if option.is_json:
-                    res.json = await response.json()
 
-                await self.middleware_end(
-                    response=res,
+        start = time.perf_counter()
+        await self.middleware_end(
+            response=res,
+        )
+        if endpoint is not None:
+            endpoint.middleware.record(middleware_time + time.perf_counter() - start)
+
+        return res
+
+    async def _exchange(
+            self, *,
+            method: str,
+            url: str,
+            query_params: Q_PARAMS_TYPE,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+            option: Options,
+    ) -> Response:
+        # response from the cache or the server
+        # Range and If-* requests of the caller get their own answers and don't touch the cache
+        cache = self.cache if method.upper() == 'GET' and is_cacheable_request(headers) else None
+        key, entry = '', None
+        if cache is not None:
+            key = cache_key(method, url, query_params)
+            entry = await cache.get(key)
+            if entry is not None and not entry.is_match(headers):
+                entry = None
+
+            if entry is None:
+                cache.misses += 1
+            elif entry.is_fresh():
+                cache.hits += 1
+                return entry.to_response(option)
+            else:
+                # stale, ask the server if the stored body is still valid
+                headers.update(entry.validators())
+
+        res = await self._hedge(method=method, url=url, headers=headers, request_kwargs=request_kwargs, option=option)
+
+        if cache is not None:
+            is_refreshed = entry is not None and res.code == 304 and entry.refresh(res.headers)
+            if is_refreshed:
+                cache.hits += 1
+                res = entry.to_response(option, res.response)  # type: ignore
+            try:
+                if is_refreshed:
+                    await cache.set(key, entry)  # type: ignore
+                else:
+                    await self._cache_store(cache, key, res, headers)
+            except Exception:
+                # the response is fine, a broken cache must not fail the request
+                cache.errors += 1
+
+        return res
+
+    async def _fetch(
+            self, *,
+            method: str,
+            url: str,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+            option: Options,
+    ) -> Response:
+        async with self._send(
+                method=method, url=url, headers=headers, request_kwargs=request_kwargs, option=option,
+        ) as response:
+            endpoint = None
+            if self.metrics is None:
+                body = await response.read()
+            else:
+                # the url of the picked upstream, not the one before balancing
+                real_url = response.history[0].url if response.history else response.url
+                endpoint = self.metrics.endpoint(method, str(real_url))
+                start = time.perf_counter()
+                body = await response.read()
+                endpoint.body.record(time.perf_counter() - start)
+
+            # aiohttp decodes gzip, deflate and br only
+            if response.headers.get('Content-Encoding', '').lower() == 'zstd':
+                body = await self._decompress('zstd', body, option)
+
+            res = Response(
+                response=response,
+                code=response.status,
+                headers=response.headers,
+                option=option,
+                body=body,
+                on_json_decoded=endpoint.json.record if endpoint is not None else None,
+            )
+
+            size = option.json_executor_size
+            if (
+                    size is not None and option.is_json and len(body) >= size
+                    and jsonlib.is_json_content_type(response.headers.get('Content-Type', ''))
+            ):
+                try:
+                    await res.read_json()
+                except ValueError:
+                    # invalid json, it is raised on access as for small responses
+                    pass
+            return res
+
+    async def _hedge(
+            self, *,
+            method: str,
+            url: str,
+            headers: Dict[str, str],
+            request_kwargs: Dict[str, Any],
+            option: Options,
+    ) -> Response:
+        hedge = option.hedge
+        data = request_kwargs.get('data')
+        if hedge is None or not hedge.is_hedged(method, data) or not _is_replayable(data):
+            return await self._fetch(
+                method=method, url=url, headers=headers, request_kwargs=request_kwargs, option=option,
+            )
+
+        async def fetch() -> Response:
+            start = time.monotonic()
+            res = await self._fetch(
+                method=method, url=url, headers=headers, request_kwargs=request_kwargs, option=option,
+            )
+            self.latency.record(time.monotonic() - start)
+            return res
+
+        # send one more request if there is no response after delay, the first finished wins
+        self.hedge_budget.deposit()
+        delay = self.latency.delay(hedge)
+        tasks = [asyncio.ensure_future(fetch())]
+        started = 1
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                is_hedging = started < hedge.attempts
+                done, _ = await asyncio.wait(
+                    tasks, timeout=delay if is_hedging else None, return_when=asyncio.FIRST_COMPLETED,
                 )
 
-                return res
+                for t in done:
+                    tasks.remove(t)
+                    if t.exception() is None:
+                        return t.result()
+                    error = t.exception()
+
+                if done:
+                    if not tasks:
+                        raise error  # type: ignore
+                    continue
+
+                if self.hedge_budget.withdraw():
+                    tasks.append(asyncio.ensure_future(fetch()))
+                    started += 1
+                else:
+                    started = hedge.attempts
         finally:
-            if option.is_close_session:
-                await self.close()
+            # losers are cancelled, their connections are closed
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _cache_store(cache: BaseCache, key: str, res: Response, request_headers: Dict[str, str]):
+        entry = CacheEntry.from_response(res, request_headers)
+        if entry is None:
+            await cache.delete(key)
+            return
+
+        if cache.is_store_json and res.option.is_json:
+            try:
+                entry.json, entry.is_json = res.json, True
+            except (ValueError, aiohttp.ContentTypeError):
+                # not json, it will fail again on access
+                pass
+        await cache.set(key, entry)
+
+    @asynccontextmanager
+    async def stream(
+            self,
+            *,
+            method: str,
+            path: Optional[str] = None,
+            headers: Optional[Dict[str, str]] = None,
+
+            query_params: Q_PARAMS_TYPE = None,
+            json: Optional[Any] = None,
+            data: Optional[Any] = None,
+            form: Optional[multipart.Easy] = None,
+
+            option: Optional[Options] = None,
+    ) -> AsyncIterator[Response]:
+        """
+        Same as request, but body is not read into memory:
+        Response.body is an async iterator of chunks with Options.chunk_size length, zstd chunks are decoded on the fly,
+        the connection is released when the context manager exits
+
+            async with http.stream(method='GET', path='/export') as r:
+                async for chunk in r.body:
+                    f.write(chunk)
+        """
+        if not option:
+            option = self.base_option
+
+        json_body = await self._dumps(json, option) if option.is_json_dumps_in_executor else None
+        url, main_headers, r = self._prepare(
+            path=path, headers=headers, query_params=query_params,
+            json=json, data=data, form=form, option=option, json_body=json_body,
+        )
+        if option.compress is not None:
+            await self._compress(r, main_headers, option.compress, option)
+
+        res = await self.middleware_start(
+            headers=main_headers,
+            request_kwargs=r
+        )
+        if res is not None:
+            if isinstance(res.body, (bytes, bytearray)):
+                res.body = _aiter([res.body] if res.body else [])
+            await self.middleware_end(
+                response=res,
+            )
+            yield res
+            return
+
+        async with self._send(
+                method=method, url=url, headers=main_headers, request_kwargs=r, option=option,
+        ) as response:
+            body: AsyncIterable[bytes] = response.content.iter_chunked(option.chunk_size)
+            # aiohttp decodes gzip, deflate and br only
+            if response.headers.get('Content-Encoding', '').lower() == 'zstd':
+                body = _decompress_chunks(body, 'zstd')
+
+            res = Response(
+                response=response,
+                code=response.status,
+                headers=response.headers,
+                option=option,
+                body=body,
+                json=None,
+            )
+
+            await self.middleware_end(
+                response=res,
+            )
+
+            yield res
 
     async def get(self, path: Optional[str] = None, *,
                   headers: Optional[Dict[str, str]] = None,
@@ -220,5 +1042,244 @@ class Http:
         return await self.request(method='TRACE', path=path, query_params=q_params, json=json, form=form, data=data,
                                   headers=headers, option=o)
 
+    def endpoint(
+            self,
+            method: str,
+            path: str = '',
+            *,
+            headers: Optional[Dict[str, str]] = None,
+            option: Optional[Options] = None,
+    ) -> Endpoint:
+        """
+        Request prepared once for many calls, path is a str.format template of url quoted params
+
+            get_user = http.endpoint('GET', '/users/{id}')
+            r = await get_user(id=1, q_params={'fields': 'name'})
+        """
+        return Endpoint(self, method, path, headers=headers, option=option)
+
+    async def download(self, path: Optional[str], dest: DEST_TYPE, *,
+                       headers: Optional[Dict[str, str]] = None,
+                       q_params: Q_PARAMS_TYPE = None,
+                       checksum: Optional[str] = None,
+                       parts: int = 1,
+                       chunk_size: int = 2 ** 20,
+                       is_write_in_thread: bool = False,
+                       o: Optional[Options] = None) -> DownloadResult:
+        """
+        Stream GET response body to a file path or a binary file object without reading it into memory
+
+            r = await http.download('/backup.tar', '/tmp/backup.tar', checksum='sha256:9f86d0...', parts=4)
+
+        A path is written to `<dest>.part` and renamed when the body is complete and verified,
+        the next call resumes `.part` with Range and If-Range requests.
+        Interrupted transfers are resumed right away, at most Options.retry attempts (default Retry()).
+
+        :param checksum: "algorithm:hexdigest" of hashlib algorithm, DownloadError if it doesn't match
+        :param parts: download a path with this count of parallel ranges, if the server supports ranges,
+            such a download starts from the beginning, `.part` of a previous call is resumed only by a single request
+        :param is_write_in_thread: write chunks to the file in the default executor, not in the event loop
+        """
+        return await Downloader(
+            self, path, dest,
+            headers=headers, query_params=q_params, checksum=checksum, parts=parts, chunk_size=chunk_size,
+            is_write_in_thread=is_write_in_thread, option=o or self.base_option,
+        ).run()
+
+    async def map(
+            self,
+            requests: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+            *,
+            concurrency: int = 10,
+            ordered: bool = False,
+            return_exceptions: bool = False,
+    ) -> AsyncIterator[BatchItem]:
+        """
+        Run Http.request for every kwargs dict from requests with at most `concurrency` requests in flight,
+        the input is consumed lazily, so memory is O(concurrency) and not O(len(requests))
+
+            async for item in http.map(({'method': 'GET', 'path': f'/users/{i}'} for i in ids), concurrency=50):
+                print(item.index, item.response.code)
+
+        :param ordered: yield results in input order, otherwise as they complete
+        :param return_exceptions: error of a request is set to BatchItem.error instead of failing the batch
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be greater than 0')
+
+        async def run(index: int, kwargs: Dict[str, Any]) -> BatchItem:
+            try:
+                return BatchItem(index=index, request=kwargs, response=await self.request(**kwargs))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return BatchItem(index=index, request=kwargs, error=e)
+
+        source = _aiter(requests)
+        tasks: Deque['asyncio.Task[BatchItem]'] = deque()
+        index = 0
+        is_exhausted = False
+
+        async def fill():
+            nonlocal index, is_exhausted
+            while not is_exhausted and len(tasks) < concurrency:
+                try:
+                    kwargs = await source.__anext__()
+                except StopAsyncIteration:
+                    is_exhausted = True
+                    break
+                tasks.append(asyncio.ensure_future(run(index, kwargs)))
+                index += 1
+
+        try:
+            await fill()
+            while tasks:
+                if ordered:
+                    done = [tasks.popleft()]
+                    await asyncio.wait(done)
+                else:
+                    done_set, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    done = [t for t in tasks if t in done_set]
+                    for t in done:
+                        tasks.remove(t)
+
+                for t in done:
+                    yield t.result()
+
+                await fill()
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def gather(
+            self,
+            requests: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+            *,
+            concurrency: int = 10,
+            return_exceptions: bool = False,
+    ) -> List[Union[Response, BaseException]]:
+        """
+        Like asyncio.gather over Http.request, but with at most `concurrency` requests in flight
+        """
+        return [
+            item.response if item.error is None else item.error  # type: ignore
+            async for item in self.map(
+                requests, concurrency=concurrency, ordered=True, return_exceptions=return_exceptions,
+            )
+        ]
+
+    def pool_stats(self) -> PoolStats:
+        """
+        Current connection pool occupancy: acquired (in use) and idle (kept alive) connections per host
+        """
+        connector = self.session.connector
+        if connector is None:
+            return PoolStats(limit=0, limit_per_host=0)
+
+        stats = PoolStats(limit=connector.limit, limit_per_host=connector.limit_per_host)
+
+        def host(key) -> HostPoolStats:
+            name = '{}:{}'.format(key.host, key.port)
+            if name not in stats.hosts:
+                stats.hosts[name] = HostPoolStats()
+            return stats.hosts[name]
+
+        # aiohttp has no public api for this
+        for key, protocols in getattr(connector, '_acquired_per_host', {}).items():
+            host(key).acquired += len(protocols)
+            stats.acquired += len(protocols)
+        for key, conns in getattr(connector, '_conns', {}).items():
+            host(key).idle += len(conns)
+            stats.idle += len(conns)
+
+        return stats
+
     async def close(self):
-        await self.session.close()
+        """
+        Close the session of the running event loop, Http can be used again after it with a new session
+        """
+        loop = asyncio.get_running_loop()
+        # the next request of this loop creates a new session
+        with self._sessions_lock:
+            state = self._sessions.pop(loop, None)
+        if state is None:
+            return
+
+        if self._session_key is None:
+            await state.session.close()
+        else:
+            # shared session is closed by the registry after the last user released it
+            await registry.release(loop, self._session_key, state.session)
+
+
+def _steps(middlewares: List[Any]) -> List[List[Any]]:
+    # adjacent concurrent middlewares are one step
+    steps: List[List[Any]] = []
+    for m in middlewares:
+        if getattr(m, 'is_concurrent', False) and steps and getattr(steps[-1][0], 'is_concurrent', False):
+            steps[-1].append(m)
+        else:
+            steps.append([m])
+    return steps
+
+
+def _is_replayable(data: Any) -> bool:
+    # body can be sent again by retries, failover and hedging, streams and iterators are read only once
+    if data is None or isinstance(data, (bytes, bytearray, str)):
+        return True
+    if isinstance(data, aiohttp.MultipartWriter):
+        return all(_is_replayable(part[0]) for part in data)
+    return not isinstance(data, _ONE_SHOT_BODIES)
+
+
+_ONE_SHOT_BODIES = (
+    aiohttp.payload.AsyncIterablePayload,
+    aiohttp.payload.IOBasePayload,
+    aiohttp.FormData,
+    io.IOBase,
+    AsyncIterable,
+)
+
+
+def _name(middleware: Any) -> str:
+    return getattr(middleware, '__qualname__', None) or type(middleware).__qualname__
+
+
+async def _aiter(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if isinstance(items, AsyncIterable):
+        async for i in items:
+            yield i
+    else:
+        for i in items:
+            yield i
+
+
+class _JsonPayload(aiohttp.BytesPayload):
+    """
+    Encoded json of a request, the bytes are kept for compression
+    """
+
+    def __init__(self, body: bytes):
+        super().__init__(body, content_type='application/json')
+        self.body = body
+
+
+async def _decompress_chunks(chunks: AsyncIterable[bytes], encoding: str) -> AsyncIterator[bytes]:
+    decompressor = compression.decompressobj(encoding)
+    async for chunk in chunks:
+        chunk = decompressor.decompress(chunk)
+        if chunk:
+            yield chunk
+
+
+class _LoopSession:
+    __slots__ = ('session', 'in_flight', 'flights')
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.in_flight = 0
+        # single flight requests, tasks of one loop
+        self.flights: Dict[Hashable, 'asyncio.Future[Response]'] = {}
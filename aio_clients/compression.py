@@ -0,0 +1,93 @@
+import zlib
+from typing import Any, Optional
+
+# request bodies can be compressed with these, zstd and br need optional packages
+ENCODINGS = ('gzip', 'deflate', 'zstd', 'br')
+
+
+def _zstd() -> Any:
+    try:
+        import zstandard  # type: ignore
+        return zstandard
+    except ImportError:
+        return None
+
+
+def _brotli() -> Any:
+    try:
+        import brotli  # type: ignore
+        return brotli
+    except ImportError:
+        pass
+
+    try:
+        import brotlicffi  # type: ignore
+        return brotlicffi
+    except ImportError:
+        return None
+
+
+def _require(module: Any, encoding: str, package: str) -> Any:
+    if module is None:
+        raise ImportError(f'{package} is required for {encoding} encoding: pip install {package}')
+    return module
+
+
+def compress(encoding: str, data: bytes, level: Optional[int] = None) -> bytes:
+    """
+    Compress a request body, level None is a codec default fast enough for requests
+    """
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == 'deflate':
+        # http deflate is zlib format
+        return zlib.compress(data, 6 if level is None else level)
+    if encoding == 'zstd':
+        zstd = _require(_zstd(), encoding, 'zstandard')
+        return zstd.ZstdCompressor(level=3 if level is None else level).compress(data)
+    if encoding == 'br':
+        brotli = _require(_brotli(), encoding, 'brotli')
+        return brotli.compress(data, quality=4 if level is None else level)
+    raise ValueError(f'unsupported encoding: {encoding}, use one of {", ".join(ENCODINGS)}')
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == 'gzip':
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return zlib.decompress(data)
+    if encoding == 'zstd':
+        zstd = _require(_zstd(), encoding, 'zstandard')
+        # streaming decompressor: frames without content size in the header are allowed
+        return zstd.ZstdDecompressor().decompressobj().decompress(data)
+    if encoding == 'br':
+        brotli = _require(_brotli(), encoding, 'brotli')
+        return brotli.decompress(data)
+    raise ValueError(f'unsupported encoding: {encoding}')
+
+
+def decompressobj(encoding: str) -> Any:
+    """
+    Decoder of a body received by chunks, `decompress(chunk)` returns the decoded part, br is decoded by aiohttp
+    """
+    if encoding == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return zlib.decompressobj()
+    if encoding == 'zstd':
+        zstd = _require(_zstd(), encoding, 'zstandard')
+        return zstd.ZstdDecompressor().decompressobj()
+    raise ValueError(f'unsupported encoding: {encoding}')
+
+
+def accept_encoding() -> str:
+    """
+    Accept-Encoding with all installed codecs, for Options(accept_encoding=...)
+    """
+    encodings = ['gzip', 'deflate']
+    if _brotli() is not None:
+        encodings.append('br')
+    if _zstd() is not None:
+        encodings.append('zstd')
+    return ', '.join(encodings)
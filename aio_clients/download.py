@@ -0,0 +1,393 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Dict, Optional, Tuple, Union
+
+import aiohttp
+
+from .exceptions import DownloadError
+from .retry import Retry
+from .struct import Options
+from .types import Q_PARAMS_TYPE
+
+if TYPE_CHECKING:
+    from .client import Http
+
+DEST_TYPE = Union[str, 'os.PathLike[str]', BinaryIO]
+
+
+@dataclass
+class DownloadResult:
+    # status of the last response, the file is not written if it is not 2xx
+    code: int
+
+    size: int = 0
+    # None for file objects
+    path: Optional[str] = None
+    # the body was continued from a partial file, of a previous call or an interrupted request
+    is_resumed: bool = False
+    # hex digest, only with checksum
+    checksum: Optional[str] = None
+
+    @property
+    def is_ok(self) -> bool:
+        return 200 <= self.code < 300
+
+
+def _validator(headers: Any) -> Optional[str]:
+    # If-Range needs a strong validator
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+def _content_range(headers: Any) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Start and total size from `Content-Range: bytes 100-199/1000`
+    """
+    unit, _, value = headers.get('Content-Range', '').partition(' ')
+    if unit != 'bytes':
+        return None, None
+
+    span, _, total = value.partition('/')
+    start = span.partition('-')[0]
+    return (
+        int(start) if start.isdigit() else None,
+        int(total) if total.isdigit() else None,
+    )
+
+
+class _Part:
+    __slots__ = ('file', 'start', 'end', 'offset', 'hasher', 'opener')
+
+    def __init__(
+            self,
+            file: Optional[BinaryIO],
+            start: int,
+            end: Optional[int],
+            hasher: Optional[Any] = None,
+            opener: Optional[Callable[[], BinaryIO]] = None,
+    ):
+        # None - created by opener on the first response with a body
+        self.file = file
+        self.opener = opener
+        self.start = start
+        # last byte of the range, None - until the end of the file
+        self.end = end
+        # next byte to download
+        self.offset = start
+        self.hasher = hasher
+
+    def open(self) -> BinaryIO:
+        if self.file is None:
+            self.file = self.opener()  # type: ignore
+        return self.file  # type: ignore
+
+
+class Downloader:
+    """
+    Body of GET request is written to a file by chunks, see Http.download
+    """
+
+    def __init__(
+            self,
+            http: 'Http',
+            path: Optional[str],
+            dest: DEST_TYPE,
+            *,
+            headers: Optional[Dict[str, str]],
+            query_params: Q_PARAMS_TYPE,
+            checksum: Optional[str],
+            parts: int,
+            chunk_size: int,
+            is_write_in_thread: bool,
+            option: Options,
+    ):
+        self.http = http
+        self.path = path
+        self.dest = dest
+        # ranges of a compressed body are not ranges of the file
+        self.headers = {'Accept-Encoding': 'identity', **(headers or {})}
+        self.query_params = query_params
+        self.parts = parts
+        self.chunk_size = chunk_size
+        self.is_write_in_thread = is_write_in_thread
+
+        self.algorithm, self.digest = '', ''
+        if checksum:
+            self.algorithm, _, self.digest = checksum.partition(':')
+            if not self.digest:
+                raise ValueError('checksum must be "algorithm:hexdigest", e.g. "sha256:9f86d0..."')
+            hashlib.new(self.algorithm)
+
+        self.option = replace(option, is_json=False, chunk_size=chunk_size)
+        # interrupted transfers are resumed from the last written byte
+        self.retry = option.retry or Retry()
+
+    def _hasher(self) -> Optional[Any]:
+        return hashlib.new(self.algorithm) if self.algorithm else None
+
+    def _is_resumable(self, e: BaseException) -> bool:
+        return isinstance(e, aiohttp.ClientPayloadError) or self.retry.is_retryable_exception(e)
+
+    async def run(self) -> DownloadResult:
+        if isinstance(self.dest, (str, os.PathLike)):
+            return await self._to_path(os.fspath(self.dest))
+        return await self._to_file(self.dest)
+
+    async def _to_file(self, f: BinaryIO) -> DownloadResult:
+        part = _Part(f, 0, None, self._hasher())
+        code, total = await self._single(part, None, None)
+        if not 200 <= code < 300:
+            return DownloadResult(code=code)
+
+        return DownloadResult(code=code, size=part.offset, checksum=self._verify(part, total))
+
+    async def _to_path(self, path: str) -> DownloadResult:
+        part_path = path + '.part'
+        validator_path = path + '.part.validator'
+
+        if self.parts > 1:
+            result = await self._parallel(path, part_path)
+            if result is not None:
+                return result
+
+        offset, validator = 0, None
+        if os.path.exists(part_path) and os.path.exists(validator_path):
+            with open(validator_path) as f:
+                validator = f.read().strip() or None
+            if validator is not None:
+                offset = os.path.getsize(part_path)
+
+        # a new file is created only for a 2xx response, an error leaves no empty `.part`
+        part = _Part(
+            open(part_path, 'ab') if offset else None, 0, None, self._hasher(),
+            opener=lambda: open(part_path, 'wb'),
+        )
+        part.offset = offset
+        try:
+            if offset and part.hasher is not None:
+                await self._hash_file(part_path, part.hasher)
+
+            code, total = await self._single(part, validator, validator_path)
+        finally:
+            if part.file is not None:
+                part.file.close()
+
+        if not 200 <= code < 300:
+            return DownloadResult(code=code)
+
+        try:
+            digest = self._verify(part, total)
+        except DownloadError:
+            _remove(part_path, validator_path)
+            raise
+
+        os.replace(part_path, path)
+        _remove(validator_path)
+        return DownloadResult(code=code, size=part.offset, path=path, is_resumed=code == 206, checksum=digest)
+
+    def _verify(self, part: _Part, total: Optional[int]) -> Optional[str]:
+        if total is not None and part.offset != total:
+            raise DownloadError(f'downloaded {part.offset} bytes, expected {total}')
+
+        if part.hasher is None:
+            return None
+
+        digest = part.hasher.hexdigest()
+        if digest != self.digest.lower():
+            raise DownloadError(f'{self.algorithm} checksum mismatch: {digest} != {self.digest}')
+        return digest
+
+    def _headers(self, part: _Part, validator: Optional[str]) -> Dict[str, str]:
+        headers = dict(self.headers)
+        if part.offset > part.start or part.end is not None:
+            headers['Range'] = 'bytes={}-{}'.format(part.offset, '' if part.end is None else part.end)
+            if validator:
+                # the server sends the whole file instead of the range if it has changed
+                headers['If-Range'] = validator
+        return headers
+
+    def _restart(self, part: _Part):
+        if part.offset > part.start:
+            file = part.open()
+            if not file.seekable():
+                raise DownloadError('the file has changed on the server and can not be written again')
+            file.seek(part.start)
+            file.truncate()
+        part.offset = part.start
+        part.hasher = self._hasher()
+
+    async def _single(
+            self,
+            part: _Part,
+            validator: Optional[str],
+            validator_path: Optional[str],
+    ) -> Tuple[int, Optional[int]]:
+        # one request, resumed from the last written byte after connection errors
+        attempt = 0
+        while True:
+            attempt += 1
+            is_range = part.offset > part.start
+            try:
+                async with self.http.stream(
+                        method='GET', path=self.path, headers=self._headers(part, validator),
+                        query_params=self.query_params, option=self.option,
+                ) as r:
+                    start, total = _content_range(r.headers)
+                    if is_range and r.code == 416:
+                        if total == part.offset:
+                            # downloaded completely by the previous call
+                            return 206, total
+                        self._restart(part)
+                        validator = None
+                        continue
+
+                    if is_range and r.code == 206:
+                        if start != part.offset:
+                            raise DownloadError(f'server sent range from {start}, expected {part.offset}')
+                    elif r.code == 200:
+                        if is_range:
+                            self._restart(part)
+                        validator = _validator(r.headers)
+                        if validator_path is not None:
+                            _save(validator_path, validator)
+                        length = r.headers.get('Content-Length', '')
+                        total = int(length) if length.isdigit() else None
+                    elif 200 < r.code < 300:
+                        raise DownloadError(f'unexpected response {r.code}')
+                    else:
+                        return r.code, None
+
+                    await self._copy(part, r.body)
+                    return r.code, total
+            except Exception as e:
+                if isinstance(e, asyncio.CancelledError) or attempt >= self.retry.attempts or not self._is_resumable(e):
+                    raise
+
+            await asyncio.sleep(self.retry.delay(attempt))
+
+    async def _parallel(self, path: str, part_path: str) -> Optional[DownloadResult]:
+        # ranges of one file at once, None if the server can't do it
+        r = await self.http.head(self.path, headers=self.headers, q_params=self.query_params, o=self.option)
+        length = r.headers.get('Content-Length', '')
+        validator = _validator(r.headers)
+        if r.code != 200 or 'bytes' not in r.headers.get('Accept-Ranges', '') or not length.isdigit() or not validator:
+            return None
+
+        total = int(length)
+        size = max(self.chunk_size, -(-total // self.parts))
+        if total <= size:
+            return None
+
+        # parts of the file are written in place, it can't be resumed by a single request later
+        _remove(path + '.part.validator')
+        with open(part_path, 'wb') as f:
+            f.truncate(total)
+
+        tasks = [
+            asyncio.ensure_future(self._range(part_path, start, min(start + size, total) - 1, validator))
+            for start in range(0, total, size)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            _remove(part_path)
+            raise
+
+        digest = None
+        hasher = self._hasher()
+        if hasher is not None:
+            await self._hash_file(part_path, hasher)
+            digest = hasher.hexdigest()
+            if digest != self.digest.lower():
+                _remove(part_path)
+                raise DownloadError(f'{self.algorithm} checksum mismatch: {digest} != {self.digest}')
+
+        os.replace(part_path, path)
+        return DownloadResult(code=200, size=total, path=path, checksum=digest)
+
+    async def _range(self, part_path: str, start: int, end: int, validator: str):
+        with open(part_path, 'r+b') as f:
+            f.seek(start)
+            part = _Part(f, start, end)
+
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    async with self.http.stream(
+                            method='GET', path=self.path, headers=self._headers(part, validator),
+                            query_params=self.query_params, option=self.option,
+                    ) as r:
+                        if r.code != 206 or _content_range(r.headers)[0] != part.offset:
+                            raise DownloadError(
+                                f'range request failed with {r.code}, the file has changed or ranges are not supported'
+                            )
+                        await self._copy(part, r.body)
+
+                    if part.offset != end + 1:
+                        raise DownloadError(f'downloaded range {start}-{part.offset - 1}, expected {start}-{end}')
+                    return
+                except Exception as e:
+                    if (
+                            isinstance(e, asyncio.CancelledError)
+                            or attempt >= self.retry.attempts
+                            or not self._is_resumable(e)
+                    ):
+                        raise
+
+                await asyncio.sleep(self.retry.delay(attempt))
+
+    async def _copy(self, part: _Part, body: Any):
+        file = part.open()
+        loop = asyncio.get_running_loop()
+        pending: Optional['asyncio.Future[Any]'] = None
+        try:
+            async for chunk in body:
+                if pending is not None:
+                    await pending
+                    pending = None
+
+                if self.is_write_in_thread:
+                    # disk write of the chunk overlaps with receiving the next one
+                    pending = loop.run_in_executor(None, file.write, chunk)
+                else:
+                    file.write(chunk)
+
+                part.offset += len(chunk)
+                if part.hasher is not None:
+                    part.hasher.update(chunk)
+        finally:
+            if pending is not None:
+                await pending
+
+    async def _hash_file(self, path: str, hasher: Any):
+        def read():
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    hasher.update(chunk)
+
+        await asyncio.get_running_loop().run_in_executor(None, read)
+
+
+def _save(path: str, value: Optional[str]):
+    if value is None:
+        _remove(path)
+        return
+
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _remove(*paths: str):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
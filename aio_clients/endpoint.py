@@ -0,0 +1,74 @@
+import string
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from urllib.parse import quote
+
+from . import multipart
+from .struct import Options, Response
+from .types import Q_PARAMS_TYPE
+
+if TYPE_CHECKING:
+    from .client import Http
+
+
+class Endpoint:
+    """
+    Request of Http.endpoint: url template, headers and options are merged once,
+    a call only formats the path and goes straight to the request pipeline (single flight is not used).
+
+    Changes of Http.headers after the endpoint was created are not seen by it.
+    """
+    __slots__ = ('http', 'method', 'url', 'headers', 'option', '_fields')
+
+    def __init__(
+            self,
+            http: 'Http',
+            method: str,
+            path: str = '',
+            *,
+            headers: Optional[Dict[str, str]] = None,
+            option: Optional[Options] = None,
+    ):
+        self.http = http
+        self.method = method.upper()
+        self.url = '{}{}'.format(http.host, path)
+        self.option = option or http.base_option
+
+        self.headers = {**http.headers, **headers} if headers else dict(http.headers)
+        if self.option.accept_encoding and 'Accept-Encoding' not in self.headers:
+            self.headers['Accept-Encoding'] = self.option.accept_encoding
+
+        # path params, the host can have braces only as {{ }}
+        self._fields = frozenset(name for _, name, _, _ in string.Formatter().parse(path) if name)
+
+    def __repr__(self) -> str:
+        return f'Endpoint({self.method} {self.url})'
+
+    def format_url(self, **params: Any) -> str:
+        if not self._fields:
+            return self.url
+        return self.url.format_map({k: quote(str(v), safe='') for k, v in params.items()})
+
+    async def __call__(
+            self, *,
+            headers: Optional[Dict[str, str]] = None,
+            q_params: Q_PARAMS_TYPE = None,
+            json: Optional[Any] = None,
+            data: Optional[Any] = None,
+            form: Optional[multipart.Easy] = None,
+            **params: Any,
+    ) -> Response:
+        http, option = self.http, self.option
+
+        unknown = params.keys() - self._fields
+        if unknown:
+            raise TypeError(f'{self!r} got unexpected keyword arguments: {", ".join(sorted(unknown))}')
+        url = self.format_url(**params)
+        main_headers = {**self.headers, **headers} if headers else self.headers.copy()
+        json_body = await http._dumps(json, option) if option.is_json_dumps_in_executor else None
+        r = http._prepare_kwargs(
+            main_headers, query_params=q_params, json=json, data=data, form=form, option=option, json_body=json_body,
+        )
+
+        return await http._dispatch(
+            method=self.method, url=url, query_params=q_params, headers=main_headers, request_kwargs=r, option=option,
+        )
@@ -0,0 +1,31 @@
+class AioClientsError(Exception):
+    pass
+
+
+class CircuitOpenError(AioClientsError):
+    """
+    Request is not sent: circuit breaker of the host is open
+    """
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f'circuit breaker is open for {host}, retry after {retry_after:.2f}s')
+        self.host = host
+        # seconds until the breaker lets trial requests through
+        self.retry_after = retry_after
+
+
+class DownloadError(AioClientsError):
+    """
+    Downloaded file is incomplete or corrupted: wrong length, checksum or the file has changed on the server
+    """
+
+
+class LoadShedError(AioClientsError):
+    """
+    Request is not sent: the adaptive concurrency limit is reached and the request can't wait longer
+    """
+
+    def __init__(self, limit: int, queued: int):
+        super().__init__(f'concurrency limit {limit} is reached, {queued} requests are waiting')
+        self.limit = limit
+        self.queued = queued
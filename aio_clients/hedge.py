@@ -0,0 +1,68 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, FrozenSet, Optional
+
+# methods without a body, so concurrent requests can't change the state of the server twice
+HEDGED_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+@dataclass
+class Hedge:
+    # all requests at once, the first one included
+    attempts: int = 2
+
+    # seconds before the next request, None - `percentile` of observed latency of Http
+    delay: Optional[float] = None
+    percentile: float = 0.95
+    # upper bound of observed delay, it is used until there are enough samples
+    max_delay: float = 1.0
+
+    methods: FrozenSet[str] = HEDGED_METHODS
+    # requests with a body are hedged only if it is allowed, the same body is sent concurrently
+    is_hedge_body: bool = False
+
+    def is_hedged_method(self, method: str) -> bool:
+        return method.upper() in self.methods
+
+    def is_hedged(self, method: str, data: Any = None) -> bool:
+        return self.is_hedged_method(method) and (data is None or self.is_hedge_body)
+
+
+class LatencyWindow:
+    """
+    Latency of the last `size` requests, percentiles are recalculated every `size // 10` records
+    """
+
+    def __init__(self, size: int = 1000, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._sorted: Optional[list] = None
+        self._every = max(1, size // 10)
+        self._since_sort = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, value: float):
+        self._samples.append(value)
+        self._since_sort += 1
+        if self._since_sort >= self._every:
+            self._sorted = None
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+            self._since_sort = 0
+        return self._sorted[min(len(self._sorted) - 1, int(p * len(self._sorted)))]
+
+    def delay(self, hedge: Hedge) -> float:
+        if hedge.delay is not None:
+            return hedge.delay
+
+        value = self.percentile(hedge.percentile)
+        if value is None:
+            return hedge.max_delay
+        return min(value, hedge.max_delay)
@@ -0,0 +1,40 @@
+import json
+from typing import Union
+
+from .types import JSON_LOADS_TYPE, JSON_DUMPS_TYPE
+
+
+def _fast_loads() -> JSON_LOADS_TYPE:
+    # the fastest installed decoder, all of them accept Response.body bytes as is
+    try:
+        import orjson  # type: ignore
+        return orjson.loads
+    except ImportError:  # pragma: no cover
+        pass
+
+    try:
+        import ujson  # type: ignore
+        return ujson.loads
+    except ImportError:  # pragma: no cover
+        pass
+
+    return json.loads
+
+
+loads: JSON_LOADS_TYPE = _fast_loads()
+
+# encoder stays stdlib by default: request body is byte to byte the same as aiohttp json=,
+# set Options(json_dumps=orjson.dumps) for speed
+dumps: JSON_DUMPS_TYPE = json.dumps
+
+
+def to_bytes(value: Union[str, bytes]) -> bytes:
+    if isinstance(value, str):
+        return value.encode()
+    return value
+
+
+def is_json_content_type(content_type: str) -> bool:
+    # application/json, application/problem+json, ...
+    mimetype = content_type.split(';', 1)[0].strip().lower()
+    return mimetype == 'application/json' or (mimetype.startswith('application/') and mimetype.endswith('+json'))
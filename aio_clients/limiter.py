@@ -0,0 +1,274 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, FrozenSet, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+from .exceptions import LoadShedError
+
+AIMD = 'aimd'
+# Gradient2 of Netflix concurrency-limits: the limit follows the ratio of long term to current latency
+GRADIENT = 'gradient'
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, at most `burst` tokens at once.
+
+    Tokens are reserved: the balance may go below zero and every caller sleeps exactly
+    until its own token is refilled, so waiting is FIFO and without polling.
+    """
+    __slots__ = ('rate', 'burst', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be greater than 0 and burst at least 1')
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Take a token, returns seconds to wait until it is available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class RateLimiter:
+    """
+    Client side rate limit for Http: a token bucket per host and optionally per path prefix
+
+        RateLimiter(rate=10, burst=20, paths={'/search': (1, 1)})
+
+    :param rate: requests per second
+    :param burst: requests that can be made at once, default is rate
+    :param paths: url path prefix -> (rate, burst), the longest matching prefix wins
+    """
+
+    def __init__(
+            self,
+            rate: float,
+            burst: Optional[int] = None,
+            *,
+            paths: Optional[Dict[str, Tuple[float, int]]] = None,
+    ):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        # check values now and not on the first request
+        TokenBucket(self.rate, self.burst)
+
+        self.paths = sorted((paths or {}).items(), key=lambda i: len(i[0]), reverse=True)
+        for _, (rate, burst) in self.paths:
+            TokenBucket(rate, burst)
+
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+        # time spent waiting for a token
+        self.throttled_seconds = 0.0
+        self.throttled_requests = 0
+
+    def bucket(self, url: str) -> TokenBucket:
+        parts = urlsplit(url)
+
+        prefix, rate, burst = '', self.rate, self.burst
+        for path_prefix, (path_rate, path_burst) in self.paths:
+            if parts.path.startswith(path_prefix):
+                prefix, rate, burst = path_prefix, path_rate, path_burst
+                break
+
+        key = (parts.netloc, prefix)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, url: str):
+        bucket = self.bucket(url)
+        delay = bucket.reserve()
+        if not delay:
+            return
+
+        self.throttled_requests += 1
+        start = time.monotonic()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            bucket.refund()
+            raise
+        finally:
+            self.throttled_seconds += time.monotonic() - start
+
+
+class AdaptiveLimiter:
+    """
+    Limit of requests in flight of Http that follows the latency of the server, requests above the limit wait in a queue
+
+        Http(host=..., concurrency_limiter=AdaptiveLimiter(max_wait=1))
+
+    AIMD: the limit grows by 1 per `limit` requests while it is used at least by half and
+    is multiplied by `backoff` on a drop: a response with status from `statuses`, an error from `exceptions`
+    or a response slower than `latency_threshold`.
+    GRADIENT: the limit is scaled by long term latency / latency of the request (0.5 - 1) and
+    gets sqrt(limit) on top as a queue, so it shrinks when the server starts to queue requests.
+
+    The limiter is not thread safe: waiting requests are woken up without the loop, use it from one event loop.
+
+    :param max_wait: seconds a request waits for the limit, then LoadShedError, None - wait as long as needed
+    :param max_queue: requests waiting at once, LoadShedError for the others, None - no limit
+    """
+
+    def __init__(
+            self, *,
+            algorithm: str = AIMD,
+            initial_limit: int = 20,
+            min_limit: int = 1,
+            max_limit: int = 1000,
+            max_wait: Optional[float] = None,
+            max_queue: Optional[int] = None,
+            backoff: float = 0.9,
+            latency_threshold: Optional[float] = None,
+            tolerance: float = 1.5,
+            smoothing: float = 0.2,
+            long_window: int = 600,
+            statuses: FrozenSet[int] = frozenset({429, 503}),
+            exceptions: Tuple[Type[BaseException], ...] = (asyncio.TimeoutError,),
+    ):
+        if algorithm not in (AIMD, GRADIENT):
+            raise ValueError(f'unknown algorithm {algorithm}, one of {AIMD}, {GRADIENT}')
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('limits must be 1 <= min_limit <= initial_limit <= max_limit')
+
+        self.algorithm = algorithm
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.long_window = long_window
+        self.statuses = statuses
+        self.exceptions = exceptions
+
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        # long term latency of GRADIENT, seconds
+        self.long_latency = 0.0
+        self._samples = 0
+        self._waiters: Deque['asyncio.Future[None]'] = deque()
+
+        # time spent waiting for the limit
+        self.waited_seconds = 0.0
+        self.waited_requests = 0
+        # requests rejected with LoadShedError
+        self.shed = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if self.max_wait == 0 or (self.max_queue is not None and len(self._waiters) >= self.max_queue):
+            self.shed += 1
+            raise LoadShedError(int(self.limit), len(self._waiters))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.waited_requests += 1
+        start = time.monotonic()
+        try:
+            # the slot is handed over by release, in_flight is already counted
+            await asyncio.wait_for(waiter, self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot came at the same time
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    # already taken from the queue by _wake in the same tick
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.shed += 1
+                raise LoadShedError(int(self.limit), len(self._waiters)) from None
+            raise
+        finally:
+            self.waited_seconds += time.monotonic() - start
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def record(self, seconds: float, is_drop: bool = False):
+        """
+        Latency of a request to the response headers, called before release
+        """
+        if self.latency_threshold is not None and seconds > self.latency_threshold:
+            is_drop = True
+
+        # the limit can't be judged if it is not used
+        is_utilized = self.in_flight * 2 >= self.limit
+
+        if self.algorithm == AIMD:
+            if is_drop:
+                limit = self.limit * self.backoff
+            elif is_utilized:
+                limit = self.limit + 1 / self.limit
+            else:
+                return
+        else:
+            self._samples += 1
+            if self._samples == 1:
+                self.long_latency = seconds
+            else:
+                alpha = 2 / (min(self._samples, self.long_window) + 1)
+                self.long_latency += (seconds - self.long_latency) * alpha
+
+            if is_drop:
+                gradient = 0.5
+            else:
+                gradient = max(0.5, min(1.0, self.tolerance * self.long_latency / seconds)) if seconds > 0 else 1.0
+            if gradient == 1.0 and not is_utilized:
+                return
+            target = self.limit * gradient + math.sqrt(self.limit)
+            limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+
+        self.limit = min(float(self.max_limit), max(float(self.min_limit), limit))
+        self._wake()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'shed': self.shed,
+            'waited_requests': self.waited_requests,
+            'waited_seconds': self.waited_seconds,
+        }
@@ -0,0 +1,292 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+class Histogram:
+    """
+    HDR-like histogram of durations in seconds with microsecond resolution:
+    each power of two is split into 2 ** precision linear buckets (~6% error with precision=4),
+    memory is fixed and record is O(1) without allocations
+    """
+    __slots__ = ('precision', 'counts', 'count', 'sum', 'max')
+
+    MAX_SHIFT = 32  # 2 ** 36 us, about 19 hours
+
+    def __init__(self, precision: int = 4):
+        self.precision = precision
+        self.counts = [0] * ((self.MAX_SHIFT + 2) << precision)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, us: int) -> int:
+        sub = 1 << self.precision
+        if us < sub:
+            return us
+        shift = min(us.bit_length() - self.precision - 1, self.MAX_SHIFT)
+        mantissa = min(us >> shift, (sub << 1) - 1)
+        return ((shift + 1) << self.precision) + mantissa - sub
+
+    def _upper(self, index: int) -> float:
+        sub = 1 << self.precision
+        if index < sub:
+            return (index + 1) / 1e6
+        shift = (index >> self.precision) - 1
+        mantissa = (index & (sub - 1)) + sub
+        return ((mantissa + 1) << shift) / 1e6
+
+    def record(self, seconds: float):
+        self.counts[self._index(max(0, int(seconds * 1e6)))] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper bound of the bucket with q-th value, 0 < q <= 1
+        """
+        if not self.count:
+            return 0.0
+
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # the last bucket also holds all values above the range
+                if index == len(self.counts) - 1:
+                    return self.max
+                return min(self._upper(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+# phases of a request, `connect` includes tls handshake: aiohttp has no separate trace for it
+PHASES = ('total', 'dns', 'connect', 'ttfb', 'body', 'json', 'middleware')
+
+
+class EndpointMetrics:
+    """
+    Metrics of one host and method
+    """
+    __slots__ = PHASES + ('host', 'method', 'in_flight', 'requests', 'errors', 'bytes_in', 'bytes_out', 'codes')
+
+    def __init__(self, host: str, method: str, precision: int):
+        self.host = host
+        self.method = method
+
+        self.total = Histogram(precision)
+        self.dns = Histogram(precision)
+        self.connect = Histogram(precision)
+        self.ttfb = Histogram(precision)
+        self.body = Histogram(precision)
+        self.json = Histogram(precision)
+        self.middleware = Histogram(precision)
+
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.codes: Dict[int, int] = {}
+
+    def histogram(self, phase: str) -> Histogram:
+        return getattr(self, phase)
+
+
+class Attempt:
+    """
+    One network attempt in flight, passed to aiohttp tracing as trace_request_ctx
+    """
+    __slots__ = ('endpoint', 'start', 'dns_start', 'connect_start')
+
+    def __init__(self, endpoint: EndpointMetrics):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.dns_start = 0.0
+        self.connect_start = 0.0
+
+
+class Metrics:
+    """
+    Latency, throughput and error metrics of Http per host and method
+
+        metrics = Metrics()
+        http = Http(host=..., metrics=metrics)
+        print(metrics.prometheus())
+
+    Nothing is recorded and allocated per request when Http has no metrics.
+    """
+
+    def __init__(self, precision: int = 4):
+        self.precision = precision
+        self._endpoints: Dict[Tuple[str, str], EndpointMetrics] = {}
+        # own time of every middleware by name, time of the inner call is not included for around middlewares
+        self.middlewares: Dict[str, Histogram] = {}
+        # current values of Http parts, like the limit of AdaptiveLimiter
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_dns_resolvehost_start.append(self._on_dns_start)  # type: ignore
+        self.trace_config.on_dns_resolvehost_end.append(self._on_dns_end)  # type: ignore
+        self.trace_config.on_connection_create_start.append(self._on_connect_start)  # type: ignore
+        self.trace_config.on_connection_create_end.append(self._on_connect_end)  # type: ignore
+        self.trace_config.on_request_chunk_sent.append(self._on_chunk_sent)  # type: ignore
+        self.trace_config.on_response_chunk_received.append(self._on_chunk_received)  # type: ignore
+
+    def endpoint(self, method: str, url: str) -> EndpointMetrics:
+        key = (urlsplit(url).netloc, method.upper())
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = EndpointMetrics(key[0], key[1], self.precision)
+        return endpoint
+
+    def endpoints(self) -> List[EndpointMetrics]:
+        return list(self._endpoints.values())
+
+    def begin(self, method: str, url: str) -> Attempt:
+        endpoint = self.endpoint(method, url)
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        return Attempt(endpoint)
+
+    def headers(self, attempt: Attempt, code: int):
+        attempt.endpoint.ttfb.record(time.perf_counter() - attempt.start)
+        codes = attempt.endpoint.codes
+        codes[code] = codes.get(code, 0) + 1
+
+    def end(self, attempt: Attempt, error: Optional[BaseException] = None):
+        endpoint = attempt.endpoint
+        endpoint.in_flight -= 1
+        endpoint.total.record(time.perf_counter() - attempt.start)
+        if error is not None:
+            endpoint.errors += 1
+
+    def record_middleware(self, name: str, seconds: float):
+        histogram = self.middlewares.get(name)
+        if histogram is None:
+            histogram = self.middlewares[name] = Histogram(self.precision)
+        histogram.record(seconds)
+
+    def gauge(self, name: str, value: Callable[[], float]):
+        self.gauges[name] = value
+
+    # aiohttp tracing
+
+    @staticmethod
+    def _attempt(ctx: Any) -> Optional[Attempt]:
+        attempt = getattr(ctx, 'trace_request_ctx', None)
+        return attempt if isinstance(attempt, Attempt) else None
+
+    async def _on_dns_start(self, session, ctx, params):
+        attempt = self._attempt(ctx)
+        if attempt is not None:
+            attempt.dns_start = time.perf_counter()
+
+    async def _on_dns_end(self, session, ctx, params):
+        attempt = self._attempt(ctx)
+        if attempt is not None and attempt.dns_start:
+            attempt.endpoint.dns.record(time.perf_counter() - attempt.dns_start)
+
+    async def _on_connect_start(self, session, ctx, params):
+        attempt = self._attempt(ctx)
+        if attempt is not None:
+            attempt.connect_start = time.perf_counter()
+
+    async def _on_connect_end(self, session, ctx, params):
+        attempt = self._attempt(ctx)
+        if attempt is not None and attempt.connect_start:
+            attempt.endpoint.connect.record(time.perf_counter() - attempt.connect_start)
+
+    async def _on_chunk_sent(self, session, ctx, params):
+        attempt = self._attempt(ctx)
+        if attempt is not None:
+            attempt.endpoint.bytes_out += len(params.chunk)
+
+    async def _on_chunk_received(self, session, ctx, params):
+        attempt = self._attempt(ctx)
+        if attempt is not None:
+            attempt.endpoint.bytes_in += len(params.chunk)
+
+    # export
+
+    def snapshot(self, quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99)) -> List[Dict[str, Any]]:
+        """
+        Plain data for exporters, e.g. OpenTelemetry observable callbacks
+        """
+        result = []
+        for e in self._endpoints.values():
+            item: Dict[str, Any] = {
+                'host': e.host,
+                'method': e.method,
+                'in_flight': e.in_flight,
+                'requests': e.requests,
+                'errors': e.errors,
+                'bytes_in': e.bytes_in,
+                'bytes_out': e.bytes_out,
+                'codes': dict(e.codes),
+            }
+            for phase in PHASES:
+                h = e.histogram(phase)
+                item[phase] = {
+                    'count': h.count,
+                    'sum': h.sum,
+                    'max': h.max,
+                    **{f'p{int(q * 100)}': h.percentile(q) for q in quantiles},
+                }
+            result.append(item)
+        return result
+
+    def prometheus(self, prefix: str = 'aio_clients', quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99)) -> str:
+        """
+        Prometheus text exposition format, latency is exported as summaries
+        """
+        lines = [
+            f'# TYPE {prefix}_requests_total counter',
+            f'# TYPE {prefix}_errors_total counter',
+            f'# TYPE {prefix}_in_flight gauge',
+            f'# TYPE {prefix}_bytes_in_total counter',
+            f'# TYPE {prefix}_bytes_out_total counter',
+            f'# TYPE {prefix}_responses_total counter',
+        ]
+        for phase in PHASES:
+            lines.append(f'# TYPE {prefix}_{phase}_seconds summary')
+        lines.append(f'# TYPE {prefix}_middleware_call_seconds summary')
+        for name in self.gauges:
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+
+        for e in self._endpoints.values():
+            labels = f'host="{e.host}",method="{e.method}"'
+            lines.append(f'{prefix}_requests_total{{{labels}}} {e.requests}')
+            lines.append(f'{prefix}_errors_total{{{labels}}} {e.errors}')
+            lines.append(f'{prefix}_in_flight{{{labels}}} {e.in_flight}')
+            lines.append(f'{prefix}_bytes_in_total{{{labels}}} {e.bytes_in}')
+            lines.append(f'{prefix}_bytes_out_total{{{labels}}} {e.bytes_out}')
+            for code, count in sorted(e.codes.items()):
+                lines.append(f'{prefix}_responses_total{{{labels},code="{code}"}} {count}')
+
+            for phase in PHASES:
+                h = e.histogram(phase)
+                for q in quantiles:
+                    lines.append(f'{prefix}_{phase}_seconds{{{labels},quantile="{q}"}} {h.percentile(q)}')
+                lines.append(f'{prefix}_{phase}_seconds_sum{{{labels}}} {h.sum}')
+                lines.append(f'{prefix}_{phase}_seconds_count{{{labels}}} {h.count}')
+
+        for name, h in self.middlewares.items():
+            labels = f'middleware="{name}"'
+            for q in quantiles:
+                lines.append(f'{prefix}_middleware_call_seconds{{{labels},quantile="{q}"}} {h.percentile(q)}')
+            lines.append(f'{prefix}_middleware_call_seconds_sum{{{labels}}} {h.sum}')
+            lines.append(f'{prefix}_middleware_call_seconds_count{{{labels}}} {h.count}')
+
+        for name, value in self.gauges.items():
+            lines.append(f'{prefix}_{name} {value()}')
+
+        return '\n'.join(lines) + '\n'
@@ -4,6 +4,7 @@ from .struct import Form
 
 
 class Writer:
+    # collects the whole body in memory, for tests and debugging, requests are streamed to the socket
     def __init__(self):
         self.buffer = bytearray()
 
@@ -0,0 +1,59 @@
+import asyncio
+import mmap
+import os
+from typing import Any, AsyncIterable, Optional, Union
+
+from aiohttp import payload
+from aiohttp.abc import AbstractStreamWriter
+
+CHUNK_SIZE = 2 ** 16
+
+
+class PathPayload(payload.Payload):
+    """
+    File on disk, it is opened on every write and read in chunks in the default executor,
+    so memory is flat and the request can be sent again by retries
+    """
+
+    def __init__(self, value: Union[str, 'os.PathLike[str]'], *args: Any, chunk_size: int = CHUNK_SIZE, **kwargs: Any):
+        super().__init__(os.fspath(value), *args, **kwargs)
+        self.chunk_size = chunk_size
+        self._size = os.stat(self._value).st_size
+
+    async def write(self, writer: AbstractStreamWriter):
+        loop = asyncio.get_running_loop()
+        f = await loop.run_in_executor(None, open, self._value, 'rb')
+        try:
+            chunk = await loop.run_in_executor(None, f.read, self.chunk_size)
+            while chunk:
+                await writer.write(chunk)
+                chunk = await loop.run_in_executor(None, f.read, self.chunk_size)
+        finally:
+            await loop.run_in_executor(None, f.close)
+
+
+class MmapPayload(payload.Payload):
+    """
+    Memory-mapped file, written by slices of memoryview without copies,
+    pages are loaded by the os when they are sent
+    """
+
+    def __init__(self, value: mmap.mmap, *args: Any, chunk_size: int = CHUNK_SIZE, **kwargs: Any):
+        super().__init__(value, *args, **kwargs)
+        self.chunk_size = chunk_size
+        self._size = len(value)
+
+    async def write(self, writer: AbstractStreamWriter):
+        view = memoryview(self._value)
+        for offset in range(0, len(view), self.chunk_size):
+            await writer.write(view[offset:offset + self.chunk_size])  # type: ignore
+
+
+class AsyncIterablePayload(payload.AsyncIterablePayload):
+    """
+    aiohttp AsyncIterablePayload with known size, so the part and the request have Content-Length
+    """
+
+    def __init__(self, value: AsyncIterable[bytes], *args: Any, size: Optional[int] = None, **kwargs: Any):
+        super().__init__(value, *args, **kwargs)
+        self._size = size
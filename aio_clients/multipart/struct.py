@@ -1,5 +1,9 @@
+import mmap
+import os
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, AsyncIterable, Optional
+
+from .payload import PathPayload, MmapPayload, AsyncIterablePayload
 
 
 @dataclass
@@ -18,8 +22,26 @@ class Form:
 
 @dataclass
 class File(Form):
+    """
+    value is bytes, str, a path (pathlib.Path), an open file, mmap.mmap or an async iterator of bytes,
+    files and iterators are streamed in chunks and never read into memory as a whole
+    """
     file_name: str
 
+    # size of async iterator value, so the request has Content-Length instead of chunked encoding;
+    # iterators and open files are read once, requests with them are not retried, failed over or hedged
+    size: Optional[int] = None
+
+    def get_value(self):
+        if isinstance(self.value, os.PathLike):
+            return PathPayload(self.value)
+        if isinstance(self.value, mmap.mmap):
+            return MmapPayload(self.value)
+        if isinstance(self.value, AsyncIterable) and self.size is not None:
+            return AsyncIterablePayload(self.value, size=self.size)
+        # bytes, memoryview, open files and iterators without size are aiohttp payloads as is
+        return super().get_value()
+
     def params(self):
         return {
             'filename': self.file_name,
@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import FrozenSet, Optional, Tuple, Type
+
+import aiohttp
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'TRACE', 'PUT', 'DELETE'})
+
+# connection errors that will not pass on the next attempt
+_NOT_RETRYABLE = (aiohttp.ClientSSLError, aiohttp.ServerFingerprintMismatch)
+
+
+@dataclass
+class Retry:
+    # all attempts, the first one included
+    attempts: int = 3
+
+    statuses: FrozenSet[int] = frozenset({429, 502, 503, 504})
+    exceptions: Tuple[Type[BaseException], ...] = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+    # not idempotent requests can be retried only if they are listed here
+    methods: FrozenSet[str] = IDEMPOTENT_METHODS
+
+    # full jitter: sleep random(0, min(backoff_max, backoff * 2 ** (attempt - 1))) seconds after attempt
+    backoff: float = 0.1
+    backoff_max: float = 10
+
+    # sleep as long as the server asks in Retry-After, but not longer than retry_after_max
+    is_retry_after: bool = True
+    retry_after_max: float = 60
+
+    def is_retryable_method(self, method: str) -> bool:
+        return method.upper() in self.methods
+
+    def is_retryable_exception(self, e: BaseException) -> bool:
+        return isinstance(e, self.exceptions) and not isinstance(e, _NOT_RETRYABLE)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None and self.is_retry_after:
+            return min(retry_after, self.retry_after_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (attempt - 1)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After is delay in seconds or http date
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date is None:
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class RetryBudget:
+    """
+    Token bucket shared by all requests of Http, so retries can't turn an outage into a retry storm:
+    every request deposits `ratio` tokens, every retry withdraws one token,
+    `min_per_second` tokens are added every second so clients with low traffic still can retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1, max_tokens: float = 100):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+
+        self.tokens = min_per_second
+        # retries that were not made because the budget is empty
+        self.exhausted = 0
+
+        self._updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def deposit(self):
+        self._refill()
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+
+        self.tokens -= 1
+        return True
@@ -0,0 +1,112 @@
+import asyncio
+import weakref
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import aiohttp
+
+from .struct import Options
+
+
+def _freeze(value: Any) -> Hashable:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        # dicts, lists, ... are compared by identity
+        return id(value)
+
+
+def session_key(option: Options, trace_configs: Tuple[aiohttp.TraceConfig, ...] = ()) -> Tuple[Hashable, ...]:
+    """
+    Sessions are shared only between Http instances with the same connection settings
+
+    :param trace_configs: trace configs added by Http itself, e.g. of Metrics
+    """
+    kwargs = option.session_kwargs or {}
+    return (
+        option.timeout,
+        option.trace_config,
+        trace_configs,
+        option.pool,
+        tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())),
+    )
+
+
+class _Entry:
+    __slots__ = ('session', 'refs', 'handle')
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.refs = 0
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class SessionRegistry:
+    """
+    Process wide registry of shared ClientSession per event loop and connection settings.
+
+    Http with Options(is_shared_session=True) acquires a session here and releases it on close,
+    the session is closed only when the last user released it and nobody acquired it again for `linger` seconds,
+    so short-lived Http instances reuse warm keep-alive connections.
+    """
+
+    def __init__(self, linger: float = 15):
+        self.linger = linger
+        self._loops: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Entry]]' = \
+            weakref.WeakKeyDictionary()
+
+    def acquire(
+            self,
+            loop: asyncio.AbstractEventLoop,
+            key: Hashable,
+            factory: Callable[[], aiohttp.ClientSession],
+    ) -> aiohttp.ClientSession:
+        entries = self._loops.setdefault(loop, {})
+
+        entry = entries.get(key)
+        if entry is None or entry.session.closed:
+            entry = entries[key] = _Entry(factory())
+
+        if entry.handle is not None:
+            entry.handle.cancel()
+            entry.handle = None
+
+        entry.refs += 1
+        return entry.session
+
+    async def release(self, loop: asyncio.AbstractEventLoop, key: Hashable, session: aiohttp.ClientSession):
+        entries = self._loops.get(loop, {})
+        entry = entries.get(key)
+        if entry is None or entry.session is not session:
+            return
+
+        entry.refs -= 1
+        if entry.refs > 0:
+            return
+
+        if self.linger > 0:
+            entry.handle = loop.call_later(self.linger, self._expire, loop, key, entry)
+        else:
+            del entries[key]
+            await entry.session.close()
+
+    def _expire(self, loop: asyncio.AbstractEventLoop, key: Hashable, entry: _Entry):
+        entries = self._loops.get(loop, {})
+        if entries.get(key) is not entry or entry.refs > 0:
+            return
+
+        del entries[key]
+        loop.create_task(entry.session.close())
+
+    async def close(self):
+        """
+        Close all shared sessions of the running loop, call it on application shutdown
+        """
+        entries = self._loops.pop(asyncio.get_running_loop(), {})
+        for entry in entries.values():
+            if entry.handle is not None:
+                entry.handle.cancel()
+            await entry.session.close()
+
+
+registry = SessionRegistry()
@@ -1,11 +1,69 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from aiohttp import ClientTimeout, TraceConfig, ClientResponse
-from multidict import CIMultiDictProxy  # type: ignore
+from aiohttp import ClientTimeout, TraceConfig, ClientResponse, ContentTypeError, TCPConnector, RequestInfo
+from aiohttp.helpers import parse_mimetype
+from multidict import CIMultiDict, CIMultiDictProxy  # type: ignore
+from yarl import URL
 
+from . import jsonlib
 from .__version__ import __version__
-from .types import MiddlewareStart, MiddlewareEnd
+from .hedge import Hedge
+from .retry import Retry
+from .types import MiddlewareStart, MiddlewareEnd, MiddlewareAround, JSON_LOADS_TYPE, JSON_DUMPS_TYPE
+
+
+@dataclass(frozen=True)
+class Pool:
+    # simultaneous connections in total and to the same host:port, 0 - no limit
+    limit: int = 100
+    limit_per_host: int = 0
+
+    # seconds an idle connection is kept alive, None - aiohttp default (15s)
+    keepalive_timeout: Optional[float] = None
+    # seconds dns answers are cached, None - forever
+    ttl_dns_cache: Optional[int] = 10
+
+    # don't reuse connections, close each after the request
+    force_close: bool = False
+    # abort ssl transports that were not closed cleanly by the server
+    enable_cleanup_closed: bool = False
+
+    def connector(self) -> TCPConnector:
+        kwargs: Dict[str, Any] = {}
+        if self.keepalive_timeout is not None:
+            kwargs['keepalive_timeout'] = self.keepalive_timeout
+
+        return TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            force_close=self.force_close,
+            enable_cleanup_closed=self.enable_cleanup_closed,
+            **kwargs,
+        )
+
+
+@dataclass
+class HostPoolStats:
+    acquired: int = 0
+    idle: int = 0
+
+
+@dataclass
+class PoolStats:
+    limit: int
+    limit_per_host: int
+
+    acquired: int = 0
+    idle: int = 0
+
+    # key is host:port
+    hosts: Dict[str, HostPoolStats] = field(default_factory=dict)
 
 
 @dataclass
@@ -17,19 +75,114 @@ class Options:
 
     # use only one reqeust
     is_close_session: bool = False
+    # take the session from aio_clients.session.registry, it is shared with other Http with the same settings
+    is_shared_session: bool = False
 
     timeout: ClientTimeout = ClientTimeout(10)
     trace_config: Optional[TraceConfig] = None
     user_agent: str = f'aio-clients/{__version__}'
 
+    # chunk size for Http.stream body iterator
+    chunk_size: int = 2 ** 16
+
+    # Content-Encoding of request bodies (json, bytes, str): gzip, deflate, zstd or br, see compression.py
+    compress: Optional[str] = None
+    # bodies smaller than this are sent as is
+    compress_min_size: int = 1024
+    compress_level: Optional[int] = None
+    # bodies from this size are compressed in `executor`, not in the event loop
+    compress_executor_size: int = 2 ** 18
+
+    # Accept-Encoding of requests, None - aiohttp default, compression.accept_encoding() - all installed codecs,
+    # aiohttp decodes gzip, deflate and br, zstd is decoded by Http.request
+    accept_encoding: Optional[str] = None
+
+    # orjson.loads, ujson.loads, msgspec.json.decode, ...
+    json_loads: JSON_LOADS_TYPE = jsonlib.loads
+    # str or bytes result, orjson.dumps, ujson.dumps, msgspec.json.encode, ...
+    json_dumps: JSON_DUMPS_TYPE = jsonlib.dumps
+    # json responses from this size are decoded in `executor` when the body is read, None - in the event loop on access
+    json_executor_size: Optional[int] = None
+    # request json is encoded in `executor`, its size is not known before encoding
+    is_json_dumps_in_executor: bool = False
+
+    # for json and compression work off the event loop, None - default executor of the loop (threads),
+    # ProcessPoolExecutor needs picklable json_loads and json_dumps
+    executor: Optional[Executor] = None
+
+    # connection pool settings, connector from session_kwargs has priority
+    pool: Optional[Pool] = None
+    # retry policy, retries of all requests of Http are limited by Http.retry_budget
+    retry: Optional[Retry] = None
+    # send more requests if the first one is slow, limited by Http.hedge_budget
+    hedge: Optional[Hedge] = None
+
     session_kwargs: Optional[Dict[str, Any]] = None
     request_kwargs: Optional[Dict[str, Any]] = None
 
+    def __setattr__(self, key, value):
+        super().__setattr__(key, value)
+        # any field change drops precomputed request kwargs
+        self.__dict__.pop('_request_base', None)
+
+    def request_base(self) -> Dict[str, Any]:
+        """
+        Request kwargs that are the same for every call with this Options,
+        built once and cached until a field is set again (in place changes of request_kwargs are not tracked)
+        """
+        base = self.__dict__.get('_request_base')
+        if base is None:
+            base = {}
+            if self.timeout:
+                base['timeout'] = self.timeout
+            if self.is_ssl is not None:
+                base['ssl'] = self.is_ssl
+            if self.request_kwargs:
+                base.update(self.request_kwargs)
+            self.__dict__['_request_base'] = base
+        return base
+
 
 @dataclass
 class Middleware:
+    # called before the request in order, returned Response is used instead of a request to the server
     start: Optional[List[MiddlewareStart]] = None
+    # called with the response in order
     end: Optional[List[MiddlewareEnd]] = None
+    # wrap the request after start middlewares, the first one is the outermost, not used by Http.stream
+    around: Optional[List[MiddlewareAround]] = None
+
+    @staticmethod
+    def concurrent(middleware: Any) -> Any:
+        """
+        Mark middleware as independent of its neighbours: adjacent concurrent middlewares run at the same time
+        """
+        @functools.wraps(middleware)
+        async def wrapper(*args, **kwargs):
+            return await middleware(*args, **kwargs)
+
+        wrapper.is_concurrent = True  # type: ignore
+        return wrapper
+
+
+class LazyJson:
+    """
+    Response.json descriptor: body is decoded on first access (if Options.is_json) and cached,
+    so responses that are never read as json don't pay for parsing
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        value = instance.__dict__.get('_json', self)
+        if value is self:
+            value = instance.decode_json() if instance.option.is_json else None
+            instance.__dict__['_json'] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__['_json'] = value
 
 
 @dataclass
@@ -40,11 +193,164 @@ class Response:
 
     option: Options
 
-    response: ClientResponse
+    # None for responses served from Http.cache without request
+    response: Optional[ClientResponse]
 
     body: Optional[Any] = None
-    json: Optional[Any] = None
+    json: Optional[Any] = field(default=LazyJson(), repr=False)
+
+    # body is taken from Http.cache
+    is_cached: bool = False
+
+    # called with seconds spent in decode_json, set by Http with metrics
+    on_json_decoded: Optional[Callable[[float], Any]] = field(default=None, repr=False, compare=False)
+
+    def decode_json(self) -> Any:
+        if self.on_json_decoded is None:
+            return self._decode_json()
+
+        start = time.perf_counter()
+        try:
+            return self._decode_json()
+        finally:
+            self.on_json_decoded(time.perf_counter() - start)
+
+    def _decode_json(self) -> Any:
+        body = self._json_body()
+        if body is None:
+            return None
+        return self.option.json_loads(body)
+
+    def _json_body(self) -> Optional[Union[bytes, str]]:
+        # same checks as ClientResponse.json, but body is parsed only once and without str decoding
+        content_type = self.headers.get('Content-Type', '')
+        if not jsonlib.is_json_content_type(content_type):
+            if self.response is not None:
+                request_info, history = self.response.request_info, self.response.history
+            else:
+                request_info, history = RequestInfo(URL(), '', CIMultiDictProxy(CIMultiDict())), ()
+            raise ContentTypeError(
+                request_info,
+                history,
+                status=self.code,
+                message=f'Attempt to decode JSON with unexpected mimetype: {content_type}',
+                headers=self.headers,
+            )
+
+        body = self.body.strip() if self.body else None
+        if not body:
+            return None
+
+        charset = parse_mimetype(content_type).parameters.get('charset')
+        if charset and charset.lower() not in ('utf-8', 'utf8'):
+            return body.decode(charset)
+        return body
 
     async def read_json(self) -> Any:
-        self.json = await self.response.json()
+        if not isinstance(self.body, (bytes, bytearray)) and self.response is not None:
+            self.body = await self.response.read()
+
+        size = self.option.json_executor_size
+        if size is None or not self.body or len(self.body) < size:
+            self.json = self.decode_json()
+            return self.json
+
+        body = self._json_body()
+        start = time.perf_counter()
+        if body is None:
+            self.json = None
+        else:
+            self.json = await asyncio.get_running_loop().run_in_executor(
+                self.option.executor, self.option.json_loads, body,
+            )
+        if self.on_json_decoded is not None:
+            self.on_json_decoded(time.perf_counter() - start)
         return self.json
+
+    def compact(self, headers: Optional[Iterable[str]] = None, *, is_body: bool = True) -> 'CompactResponse':
+        """
+        Detached copy for keeping many results: without ClientResponse and Options
+
+        :param headers: names of headers to keep, None - all of them
+        :param is_body: keep the body, otherwise only json is kept (it is decoded now)
+        """
+        if headers is None:
+            pairs = tuple(self.headers.items())
+        else:
+            names = {h.lower() for h in headers}
+            pairs = tuple((k, v) for k, v in self.headers.items() if k.lower() in names)
+
+        json = self.__dict__.get('_json', _UNSET)
+        loads = None
+        if json is _UNSET or isinstance(json, LazyJson):
+            content_type = self.headers.get('Content-Type', '')
+            charset = parse_mimetype(content_type).parameters.get('charset')
+            if not self.option.is_json or not jsonlib.is_json_content_type(content_type):
+                json = None
+            elif not is_body or (charset and charset.lower() not in ('utf-8', 'utf8')):
+                json = self.json
+            else:
+                # decoded on first access as Response.json
+                loads = self.option.json_loads
+
+        return CompactResponse(self.code, pairs, self.body if is_body else None, json, loads)
+
+
+_UNSET: Any = object()
+
+
+class CompactResponse:
+    """
+    Slotted response from Response.compact, headers are kept as a tuple and CIMultiDictProxy is built on access
+    """
+    __slots__ = ('code', 'body', '_headers', '_json', '_json_loads')
+
+    def __init__(
+            self,
+            code: int,
+            headers: Tuple[Tuple[str, str], ...],
+            body: Optional[bytes],
+            json: Any = None,
+            json_loads: Optional[JSON_LOADS_TYPE] = None,
+    ):
+        self.code = code
+        self.body = body
+        self._headers = headers
+        # _UNSET while json is not decoded by json_loads
+        self._json = _UNSET if json_loads is not None else json
+        self._json_loads = json_loads
+
+    def __repr__(self) -> str:
+        return f'CompactResponse(code={self.code}, headers={len(self._headers)}, body={len(self.body or b"")} bytes)'
+
+    @property
+    def headers(self) -> CIMultiDictProxy:
+        return CIMultiDictProxy(CIMultiDict(self._headers))
+
+    @property
+    def json(self) -> Any:
+        if self._json is _UNSET:
+            body = self.body.strip() if self.body else None
+            self._json = self._json_loads(body) if body else None  # type: ignore
+            self._json_loads = None
+        return self._json
+
+    def drop_body(self) -> 'CompactResponse':
+        """
+        Free the body, json is decoded first if it wasn't
+        """
+        _ = self.json
+        self.body = None
+        return self
+
+
+@dataclass
+class BatchItem:
+    # position of the request in Http.map input
+    index: int
+    # kwargs of Http.request
+    request: Dict[str, Any]
+
+    response: Optional[Response] = None
+    # set instead of response with return_exceptions=True
+    error: Optional[BaseException] = None
@@ -1,10 +1,13 @@
-from typing import Dict, Any, Optional, Union, Tuple, List
+from typing import Dict, Any, Optional, Union, Tuple, List, Callable
 
 Q_PARAMS_TYPE = Optional[Union[
     Dict[str, Union[str, int]],
     List[Tuple[str, Union[str, int]]]
 ]]
 
+JSON_LOADS_TYPE = Callable[[Union[str, bytes]], Any]
+JSON_DUMPS_TYPE = Callable[[Any], Union[str, bytes]]
+
 # I don't know how to write this type
 # for async function with kwargs
 # FIXME maybe i fix this type later
@@ -29,3 +32,6 @@ MiddlewareStart = Any
 #     ) -> Awaitable[None]: pass
 
 MiddlewareEnd = Any
+
+# async def around(call_next, *, method, url, headers, request_kwargs, **kwargs) -> Response
+MiddlewareAround = Any
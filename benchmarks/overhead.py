@@ -0,0 +1,86 @@
+"""
+Per-request overhead of Http over raw aiohttp.ClientSession.request
+
+    python benchmarks/overhead.py [requests]
+
+Both clients call the same in-process aiohttp server sequentially, the difference
+between the mean times is the cost of the wrapper (headers, kwargs, middleware, Response)
+"""
+import asyncio
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+from aio_clients import Http, Options
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response(body=b'{"ok": true}', content_type='application/json')
+
+
+async def bench_raw(url: str, n: int) -> float:
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(10)) as session:
+        headers = {'Content-Type': 'application/json', 'X-Token': '1234'}
+        start = time.perf_counter()
+        for _ in range(n):
+            async with session.request('GET', url, headers=headers, params={'a': 1}) as response:
+                await response.read()
+        return (time.perf_counter() - start) / n
+
+
+async def bench_http(url: str, n: int) -> float:
+    http = Http(
+        host=url, headers={'Content-Type': 'application/json', 'X-Token': '1234'}, option=Options(is_json=False),
+    )
+    start = time.perf_counter()
+    for _ in range(n):
+        await http.get(q_params={'a': 1})
+    elapsed = (time.perf_counter() - start) / n
+    await http.close()
+    return elapsed
+
+
+async def bench_prepare(n: int) -> float:
+    http = Http(host='http://localhost', headers={'Content-Type': 'application/json', 'X-Token': '1234'})
+    option = http.base_option
+    start = time.perf_counter()
+    for _ in range(n):
+        http._prepare(
+            path='/ping', headers={'X-Request-Id': '1'}, query_params={'a': 1},
+            json=None, data=None, form=None, option=option,
+        )
+    elapsed = (time.perf_counter() - start) / n
+    await http.close()
+    return elapsed
+
+
+async def main(n: int):
+    app = web.Application()
+    app.router.add_get('/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    url = f'http://127.0.0.1:{port}/'
+
+    # warm up connections and code paths
+    await bench_raw(url, 100)
+    await bench_http(url, 100)
+
+    raw = min([await bench_raw(url, n) for _ in range(3)])
+    http = min([await bench_http(url, n) for _ in range(3)])
+    prepare = await bench_prepare(n * 10)
+
+    print(f'raw aiohttp:   {raw * 1e6:8.1f} us/request')
+    print(f'Http.get:      {http * 1e6:8.1f} us/request')
+    print(f'overhead:      {(http - raw) * 1e6:8.1f} us/request')
+    print(f'Http._prepare: {prepare * 1e6:8.2f} us/call')
+
+    await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
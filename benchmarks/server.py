@@ -0,0 +1,49 @@
+"""
+Local stand-in for the echo server of docker-compose.yml, used by the benchmarks
+"""
+import os
+from typing import Tuple
+
+from aiohttp import web
+
+SMALL_JSON = b'{"id": 1, "name": "user", "tags": ["a", "b", "c"], "active": true}'
+RAW = os.urandom(4 * 2 ** 10)
+LARGE = b'[' + b','.join([SMALL_JSON] * 15_000) + b']'  # ~1 MiB
+
+
+async def json_handler(request: web.Request) -> web.Response:
+    return web.Response(body=SMALL_JSON, content_type='application/json')
+
+
+async def raw_handler(request: web.Request) -> web.Response:
+    return web.Response(body=RAW, content_type='application/octet-stream')
+
+
+async def large_handler(request: web.Request) -> web.Response:
+    return web.Response(body=LARGE, content_type='application/json')
+
+
+async def user_handler(request: web.Request) -> web.Response:
+    return web.Response(body=SMALL_JSON, content_type='application/json')
+
+
+async def echo_handler(request: web.Request) -> web.Response:
+    # body is read and dropped, the answer is small
+    await request.read()
+    return web.Response(body=SMALL_JSON, content_type='application/json')
+
+
+async def start() -> Tuple[web.AppRunner, str]:
+    app = web.Application(client_max_size=64 * 2 ** 20)
+    app.router.add_get('/json', json_handler)
+    app.router.add_get('/raw', raw_handler)
+    app.router.add_get('/large', large_handler)
+    app.router.add_get('/users/{id}', user_handler)
+    app.router.add_post('/echo', echo_handler)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{port}/'
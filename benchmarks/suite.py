@@ -0,0 +1,258 @@
+"""
+Http against bare aiohttp.ClientSession on a local server
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --compare results.json  # exit code 1 on regression
+
+For every scenario both clients make the same requests with the same concurrency, the result has
+requests per second, cpu time per request (client and server share the process, the difference is the wrapper),
+latency percentiles and peak memory traced by tracemalloc.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List
+
+import aiohttp
+
+from aio_clients import Endpoint, Http, Options
+from aio_clients.__version__ import __version__
+from aio_clients.multipart import Easy, File, Form
+
+import server
+
+HEADERS = {'Content-Type': 'application/json', 'X-Token': '1234'}
+BODY = {'items': [{'id': i, 'name': f'item {i}', 'price': i * 1.5} for i in range(20)]}
+FILE = b'x' * 64 * 2 ** 10
+
+
+@dataclass
+class Scenario:
+    concurrency: int
+    raw: Callable[[aiohttp.ClientSession, str], Awaitable[Any]]
+    http: Callable[[Http], Awaitable[Any]]
+
+
+async def raw_get_json(session: aiohttp.ClientSession, url: str):
+    async with session.get(url + 'json', headers=HEADERS) as r:
+        return await r.json()
+
+
+async def http_get_json(http: Http):
+    return (await http.get('json')).json
+
+
+async def raw_get_raw(session: aiohttp.ClientSession, url: str):
+    async with session.get(url + 'raw', headers=HEADERS) as r:
+        return await r.read()
+
+
+async def http_get_raw(http: Http):
+    return (await http.get('raw', o=Options(is_json=False))).body
+
+
+async def raw_get_large(session: aiohttp.ClientSession, url: str):
+    async with session.get(url + 'large', headers=HEADERS) as r:
+        return await r.json()
+
+
+async def http_get_large(http: Http):
+    return (await http.get('large')).json
+
+
+async def raw_get_user(session: aiohttp.ClientSession, url: str):
+    async with session.get(url + 'users/42', headers=HEADERS, params={'fields': 'name'}) as r:
+        return await r.json()
+
+
+async def http_get_user(http: Http):
+    return (await http.get('users/42', q_params={'fields': 'name'})).json
+
+
+_endpoints: 'weakref.WeakKeyDictionary[Http, Endpoint]' = weakref.WeakKeyDictionary()
+
+
+async def http_get_user_endpoint(http: Http):
+    get_user = _endpoints.get(http)
+    if get_user is None:
+        get_user = _endpoints[http] = http.endpoint('GET', 'users/{id}')
+    return (await get_user(id=42, q_params={'fields': 'name'})).json
+
+
+async def raw_post_json(session: aiohttp.ClientSession, url: str):
+    async with session.post(url + 'echo', headers=HEADERS, json=BODY) as r:
+        return await r.json()
+
+
+async def http_post_json(http: Http):
+    return (await http.post('echo', json=BODY)).json
+
+
+async def raw_post_multipart(session: aiohttp.ClientSession, url: str):
+    with aiohttp.MultipartWriter('form-data') as form:
+        form.append('12345').set_content_disposition('form-data', name='id')
+        form.append(FILE).set_content_disposition('form-data', name='file', filename='file.bin')
+    async with session.post(url + 'echo', headers={'X-Token': '1234'}, data=form) as r:
+        return await r.json()
+
+
+async def http_post_multipart(http: Http):
+    form = Easy('form-data')
+    form.add_form(Form(key='id', value=12345))
+    form.add_form(File(key='file', value=FILE, file_name='file.bin'))
+    return (await http.post('echo', form=form)).json
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    'get_json': Scenario(1, raw_get_json, http_get_json),
+    'get_raw': Scenario(1, raw_get_raw, http_get_raw),
+    'get_large': Scenario(1, raw_get_large, http_get_large),
+    'get_user': Scenario(1, raw_get_user, http_get_user),
+    'get_user_endpoint': Scenario(1, raw_get_user, http_get_user_endpoint),
+    'post_json': Scenario(1, raw_post_json, http_post_json),
+    'post_multipart': Scenario(1, raw_post_multipart, http_post_multipart),
+    'get_json_concurrent': Scenario(100, raw_get_json, http_get_json),
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def measure(call: Callable[[], Awaitable[Any]], requests: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+
+    async def worker(count: int):
+        for _ in range(count):
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(worker(c) for c in counts))
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    latencies.sort()
+    return {
+        'rps': requests / wall,
+        'cpu_us': cpu / requests * 1e6,
+        'mean_ms': sum(latencies) / len(latencies) * 1e3,
+        'p50_ms': percentile(latencies, 0.5) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+    }
+
+
+async def measure_memory(call: Callable[[], Awaitable[Any]], requests: int, concurrency: int) -> float:
+    # separate pass, tracemalloc slows everything down
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        await measure(call, requests, concurrency)
+        return (tracemalloc.get_traced_memory()[1] - start) / 2 ** 10
+    finally:
+        tracemalloc.stop()
+
+
+async def bench(name: str, scenario: Scenario, url: str, requests: int, repeat: int) -> Dict[str, Any]:
+    connector_limit = max(100, scenario.concurrency)
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=connector_limit), timeout=aiohttp.ClientTimeout(30),
+    )
+    http = Http(host=url, headers=dict(HEADERS), option=Options(timeout=aiohttp.ClientTimeout(30)))
+
+    clients = {
+        'aiohttp': lambda: scenario.raw(session, url),
+        'http': lambda: scenario.http(http),
+    }
+    result: Dict[str, Any] = {'concurrency': scenario.concurrency}
+    try:
+        for client, call in clients.items():
+            # warm up connections and code paths
+            await measure(call, min(requests, 200), scenario.concurrency)
+
+            # the best run, the others are noise of the machine
+            runs = [await measure(call, requests, scenario.concurrency) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r['cpu_us'])
+            best['memory_peak_kib'] = await measure_memory(call, min(requests, 200), scenario.concurrency)
+            result[client] = best
+
+        result['overhead_cpu_us'] = result['http']['cpu_us'] - result['aiohttp']['cpu_us']
+    finally:
+        await session.close()
+        await http.close()
+
+    print(
+        f'{name:<22} aiohttp {result["aiohttp"]["rps"]:9.0f} rps {result["aiohttp"]["cpu_us"]:8.1f} us'
+        f' | Http {result["http"]["rps"]:9.0f} rps {result["http"]["cpu_us"]:8.1f} us'
+        f' | overhead {result["overhead_cpu_us"]:6.1f} us'
+    )
+    return result
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Scenarios where cpu time of Http per request has grown more than `threshold` (0.1 - 10%)
+    """
+    regressions = []
+    for name, result in results['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+
+        before, after = base['http']['cpu_us'], result['http']['cpu_us']
+        if after > before * (1 + threshold):
+            regressions.append(f'{name}: {before:.1f} -> {after:.1f} us/request')
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    runner, url = await server.start()
+    try:
+        results = {
+            'meta': {
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'aiohttp': aiohttp.__version__,
+                'aio_clients': __version__,
+                'requests': args.requests,
+                'repeat': args.repeat,
+            },
+            'results': {
+                name: await bench(name, scenario, url, args.requests, args.repeat)
+                for name, scenario in SCENARIOS.items()
+                if not args.scenario or name in args.scenario
+            },
+        }
+    finally:
+        await runner.cleanup()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f'regression {line}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per client, the best one is reported')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='run only these scenarios')
+    parser.add_argument('--output', help='write results to this json file')
+    parser.add_argument('--compare', help='baseline json file, exit code is 1 if Http got slower')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed growth of cpu time per request')
+    sys.exit(asyncio.run(main(parser.parse_args())))
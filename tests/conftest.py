@@ -0,0 +1,22 @@
+from typing import Mapping, Optional
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from aio_clients import Options, Response
+
+
+def make_response(
+        body: bytes = b'{"a": 1}',
+        *,
+        code: int = 200,
+        content_type: str = 'application/json',
+        headers: Optional[Mapping[str, str]] = None,
+        option: Optional[Options] = None,
+) -> Response:
+    # response of the server without a connection, headers are added to Content-Type
+    all_headers = CIMultiDict({'Content-Type': content_type})
+    if headers:
+        all_headers.update(headers)
+    return Response(
+        code=code, headers=CIMultiDictProxy(all_headers), option=option or Options(), response=None, body=body,
+    )
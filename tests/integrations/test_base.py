@@ -1,13 +1,15 @@
+import asyncio
 import os
 from hashlib import sha256
 
 import aiohttp
 import pytest
 from aiohttp import ClientConnectorError
+from multidict import CIMultiDict, CIMultiDictProxy
 
 from aio_clients.__version__ import __version__
-from aio_clients import Http, Options
-from aio_clients.multipart import Easy, Form, Writer
+from aio_clients import Http, Options, Metrics, Response
+from aio_clients.multipart import Easy, Form, File, Writer
 from aio_clients.struct import Middleware
 
 ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
@@ -372,6 +374,25 @@ async def test_request_with_middleware_end():
     assert data['ok']
 
 
+@pytest.mark.integtest
+async def test_request_with_middleware_end_returning_response():
+    calls = []
+
+    async def log(response, **kwargs):
+        calls.append('log')
+        return response
+
+    async def metrics(response, **kwargs):
+        calls.append('metrics')
+
+    http = Http(host=ECHO_URL, middleware=Middleware(end=[log, metrics]))
+    r = await http.get()
+    assert r.code == 200
+    assert calls == ['log', 'metrics']
+
+    await http.close()
+
+
 @pytest.mark.integtest
 async def test_request_session_params():
     http = Http(
@@ -385,3 +406,91 @@ async def test_request_session_params():
     res = await http.get()
 
     assert res.json['request']['cookies'] == {'cookie1': 'value1', 'cookie2': 'value2'}
+
+
+@pytest.mark.integtest
+async def test_request_with_middleware_short_circuit():
+    calls = []
+
+    async def middleware_cache(headers, request_kwargs, **kwargs):
+        if headers.get('X-Cached'):
+            return Response(code=200, headers=CIMultiDictProxy(CIMultiDict()), option=Options(), response=None,
+                            body=b'{"cached": true}', json={'cached': True})
+
+    async def middleware_end(response, **kwargs):
+        calls.append(response.code)
+
+    http = Http(host=ECHO_URL, middleware=Middleware(start=[middleware_cache], end=[middleware_end]))
+
+    r = await http.get(headers={'X-Cached': '1'})
+    assert r.response is None
+    assert r.json == {'cached': True}
+
+    r = await http.get()
+    assert r.response is not None
+    assert calls == [200, 200]
+
+
+@pytest.mark.integtest
+async def test_request_with_middleware_around():
+    calls = []
+
+    async def outer(call_next, *, method, url, headers, request_kwargs, **kwargs):
+        calls.append('outer')
+        headers['X-Token'] = 'around'
+        res = await call_next()
+        calls.append('outer end')
+        return res
+
+    async def inner(call_next, **kwargs):
+        calls.append('inner')
+        res = await call_next()
+        res.body = b'{"changed": true}'
+        res.json = {'changed': True}
+        return res
+
+    http = Http(host=ECHO_URL, middleware=Middleware(around=[outer, inner]))
+    r = await http.get()
+
+    assert r.json == {'changed': True}
+    assert calls == ['outer', 'inner', 'outer end']
+
+
+@pytest.mark.integtest
+async def test_request_with_middleware_concurrent():
+    state = {'running': 0, 'max': 0}
+
+    @Middleware.concurrent
+    async def slow(headers, **kwargs):
+        state['running'] += 1
+        state['max'] = max(state['max'], state['running'])
+        await asyncio.sleep(0.05)
+        state['running'] -= 1
+
+    metrics = Metrics()
+    http = Http(host=ECHO_URL, metrics=metrics, middleware=Middleware(start=[slow, slow, slow]))
+    await http.get()
+
+    assert state['max'] == 3
+    [histogram] = metrics.middlewares.values()
+    assert histogram.count == 3
+    assert histogram.percentile(0.5) >= 0.05
+
+
+@pytest.mark.integtest
+async def test_request_form_file_path(tmp_path):
+    path = tmp_path / 'data.txt'
+    path.write_text('hello file ' * 10_000)
+
+    with Easy('form-data') as form:
+        form.add_form(Form(key='chat_id', value=12345123))
+        form.add_form(File(key='file', value=path, file_name='data.txt'))
+
+    http = Http(host=ECHO_URL)
+    r = await http.post(form=form)
+
+    assert r.code == 200
+    assert r.json['request']['headers']['content-length'] == str(form.size)
+    assert r.json['request']['body'] == {'chat_id': '12345123', 'file': 'hello file ' * 10_000}
+
+    await http.close()
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from aio_clients import Http
+from aio_clients.struct import Middleware
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+def track_in_flight():
+    state = {'now': 0, 'max': 0}
+
+    async def start(headers, request_kwargs, **kwargs):
+        state['now'] += 1
+        state['max'] = max(state['max'], state['now'])
+
+    async def end(response, **kwargs):
+        state['now'] -= 1
+
+    return state, Middleware(start=[start], end=[end])
+
+
+@pytest.mark.integtest
+async def test_batch_map():
+    state, middleware = track_in_flight()
+    http = Http(host=ECHO_URL, middleware=middleware)
+
+    async def requests():
+        for i in range(12):
+            yield {'method': 'GET', 'path': f'/{i}', 'query_params': {'echo_time': (12 - i) * 5}}
+
+    items = [item async for item in http.map(requests(), concurrency=4)]
+
+    assert state['max'] == 4
+    assert sorted(i.index for i in items) == list(range(12))
+    assert [i.index for i in items] != list(range(12))
+    assert all(i.response.json['http']['originalUrl'].startswith(f'/ping/{i.index}?') for i in items)
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_batch_gather_ordered():
+    state, middleware = track_in_flight()
+    http = Http(host=ECHO_URL, middleware=middleware)
+
+    r = await http.gather(
+        ({'method': 'GET', 'path': f'/{i}', 'query_params': {'echo_time': (10 - i) * 5}} for i in range(10)),
+        concurrency=3,
+    )
+
+    assert state['max'] == 3
+    assert [i.json['request']['params']['0'] for i in r] == [f'/ping/{i}' for i in range(10)]
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_batch_errors():
+    http = Http(host=ECHO_URL)
+    requests = [
+        {'method': 'GET'},
+        {'method': 'POST', 'json': {'a': 1}, 'data': b'1'},
+        {'method': 'GET'},
+    ]
+
+    r = await http.gather(requests, return_exceptions=True)
+    assert r[0].code == 200
+    assert isinstance(r[1], ValueError)
+    assert r[2].code == 200
+
+    with pytest.raises(ValueError):
+        await http.gather(requests)
+
+    with pytest.raises(ValueError):
+        await http.gather(requests, concurrency=0)
+
+    await http.close()
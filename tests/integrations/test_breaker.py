@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+import pytest
+
+from aio_clients import Http, CircuitBreaker, RateLimiter
+from aio_clients.exceptions import CircuitOpenError
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_breaker_open():
+    http = Http(host=ECHO_URL, breaker=CircuitBreaker(window=4, min_calls=4, failure_rate=0.5))
+
+    for code in (200, 503, 200, 502):
+        r = await http.get(q_params={'echo_code': code})
+        assert r.code == code
+
+    assert http.breaker.state(ECHO_URL) == 'open'
+    with pytest.raises(CircuitOpenError):
+        await http.get()
+
+    await http.close()
+
+
+async def test_breaker_connection_error():
+    http = Http(host='http://127.0.0.1:1/', breaker=CircuitBreaker(min_calls=2))
+
+    for _ in range(2):
+        with pytest.raises(Exception) as e:
+            await http.get()
+        assert not isinstance(e.value, CircuitOpenError)
+
+    with pytest.raises(CircuitOpenError):
+        await http.get()
+
+    assert http.breaker.snapshot()['127.0.0.1:1']['state'] == 'open'
+
+    await http.close()
+
+
+async def test_breaker_throttled_trial_cancelled():
+    http = Http(
+        host='http://127.0.0.1:1/',
+        breaker=CircuitBreaker(min_calls=1, open_timeout=0, half_open_calls=1),
+        rate_limiter=RateLimiter(rate=1, burst=1),
+    )
+    with pytest.raises(Exception):
+        await http.get()
+    assert http.breaker.state('http://127.0.0.1:1/') == 'open'
+
+    # the trial request waits for the rate limiter and is cancelled there
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(http.get(), 0.05)
+
+    circuit = http.breaker.circuit('http://127.0.0.1:1/')
+    assert circuit.half_open_in_flight == 0
+    circuit.before()
+
+    await http.close()
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from aio_clients import Http
+from aio_clients.cache import MemoryCache
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_cache_max_age():
+    cache = MemoryCache(is_store_json=True)
+    http = Http(host=ECHO_URL, cache=cache)
+
+    q_params = {'echo_header': 'Cache-Control:max-age=60'}
+    first = await http.get('/cache', q_params=q_params)
+    second = await http.get('/cache', q_params=q_params)
+
+    assert not first.is_cached
+    assert second.is_cached
+    assert second.response is None
+    assert second.body == first.body
+    assert second.json == first.json
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    r = await http.get('/cache', q_params={'echo_header': 'Cache-Control:no-store'})
+    assert not r.is_cached
+    r = await http.get('/cache', q_params={'echo_header': 'Cache-Control:no-store'})
+    assert not r.is_cached
+
+    r = await http.post('/cache', q_params=q_params)
+    assert not r.is_cached
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_cache_revalidate():
+    cache = MemoryCache()
+    http = Http(host=ECHO_URL, cache=cache)
+
+    q_params = [('echo_header', 'Cache-Control:no-cache'), ('echo_header', 'ETag:"v1"')]
+    first = await http.get('/revalidate', q_params=q_params)
+    assert first.code == 200
+    assert len(cache) == 1
+
+    second = await http.get('/revalidate', q_params=q_params, headers={'x-echo-code': '304'})
+    assert second.is_cached
+    assert second.code == 200
+    assert second.response.status == 304
+    assert second.body == first.body
+    assert second.response.request_info.headers['If-None-Match'] == '"v1"'
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_cache_write_error():
+    class BrokenCache(MemoryCache):
+        async def set(self, key, entry):
+            raise OSError('disk is full')
+
+    cache = BrokenCache()
+    http = Http(host=ECHO_URL, cache=cache)
+
+    r = await http.get('/cache', q_params={'echo_header': 'Cache-Control:max-age=60'})
+    assert r.code == 200
+    assert cache.errors == 1
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_cache_authorization():
+    cache = MemoryCache()
+    http = Http(host=ECHO_URL, cache=cache)
+
+    q_params = {'echo_header': 'Cache-Control:max-age=60'}
+    for token in ('user-a', 'user-b'):
+        r = await http.get('/cache', q_params=q_params, headers={'Authorization': token})
+        assert not r.is_cached
+        assert r.json['request']['headers']['authorization'] == token
+    assert len(cache) == 0
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_cache_partial_and_conditional_requests():
+    cache = MemoryCache()
+    http = Http(host=ECHO_URL, cache=cache)
+
+    # own validators of the caller: 304 without body is not stored and not served later
+    r = await http.get('/cache', q_params={'echo_code': 304, 'echo_header': 'Cache-Control:max-age=60'},
+                       headers={'If-None-Match': '"1"'})
+    assert r.code == 304
+    # a part of the body is not stored as the whole one
+    r = await http.get('/cache', q_params={'echo_code': 206, 'echo_header': 'Cache-Control:max-age=60'},
+                       headers={'Range': 'bytes=0-1'})
+    assert r.code == 206
+    assert len(cache) == 0 and cache.misses == 0
+
+    # 206 and 304 are not stored even without Range and If-* of the caller
+    for code in (206, 304):
+        await http.get('/cache', q_params={'echo_code': code, 'echo_header': 'Cache-Control:max-age=60'})
+    assert len(cache) == 0
+
+    r = await http.get('/cache', q_params={'echo_header': 'Cache-Control:max-age=60'})
+    assert r.code == 200 and not r.is_cached
+
+    await http.close()
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from aio_clients import Http, Options, Endpoint
+from aio_clients.struct import Middleware
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}'
+
+
+@pytest.mark.integtest
+async def test_endpoint():
+    http = Http(host=ECHO_URL, headers={'X-Token': '1'})
+    get_user = http.endpoint('get', '/users/{id}', headers={'X-Client': 'test'})
+    assert isinstance(get_user, Endpoint)
+
+    r = await get_user(id='a/b c', q_params={'fields': 'name'}, headers={'X-Token': '2'})
+    assert r.code == 200
+    assert r.json['http']['originalUrl'] == '/users/a%2Fb%20c?fields=name'
+    assert r.json['request']['query'] == {'fields': 'name'}
+    assert r.json['request']['headers']['x-token'] == '2'
+    assert r.json['request']['headers']['x-client'] == 'test'
+
+    # headers of a call don't stay in the endpoint
+    r = await get_user(id=1)
+    assert r.json['request']['headers']['x-token'] == '1'
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_endpoint_json_and_middleware():
+    async def set_token(headers, **kwargs):
+        headers['X-Token'] = 'middleware'
+
+    http = Http(host=ECHO_URL, middleware=Middleware(start=[set_token]))
+    create = http.endpoint('POST', '/users')
+
+    r = await create(json={'name': 'user'})
+    assert r.code == 200
+    assert r.json['http']['method'] == 'POST'
+    assert r.json['request']['body'] == {'name': 'user'}
+    assert r.json['request']['headers']['x-token'] == 'middleware'
+    assert 'X-Token' not in create.headers
+
+    raw = http.endpoint('GET', '/users', option=Options(is_json=False))
+    assert (await raw()).json is None
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_endpoint_missing_param():
+    http = Http(host=ECHO_URL)
+    get_user = http.endpoint('GET', '/users/{id}')
+    with pytest.raises(KeyError):
+        await get_user()
+
+    # misspelled params are not dropped silently
+    with pytest.raises(TypeError):
+        await get_user(id=1, query_params={'a': 1})
+    with pytest.raises(TypeError):
+        await http.endpoint('GET', '/users')(o=None)
+    await http.close()
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from aio_clients import Http, Options, Hedge, RetryBudget
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_hedge():
+    http = Http(
+        host=ECHO_URL,
+        option=Options(hedge=Hedge(delay=0.05)),
+        hedge_budget=RetryBudget(ratio=1, min_per_second=0),
+    )
+
+    r = await http.get(q_params={'echo_time': 100})
+    assert r.code == 200
+    assert r.json['http']['originalUrl'] == '/ping?echo_time=100'
+    assert http.hedge_budget.tokens == 0
+    assert http.pool_stats().acquired == 0
+
+    await http.close()
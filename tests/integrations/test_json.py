@@ -0,0 +1,119 @@
+import json
+import os
+
+import pytest
+from aiohttp import ContentTypeError
+
+from aio_clients import Http, Options
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_json_custom_loads_dumps():
+    calls = {'loads': 0, 'dumps': 0}
+
+    def loads(value):
+        assert isinstance(value, bytes)
+        calls['loads'] += 1
+        return json.loads(value)
+
+    def dumps(value):
+        calls['dumps'] += 1
+        return json.dumps(value, separators=(',', ':')).encode()
+
+    http = Http(host=ECHO_URL, option=Options(json_loads=loads, json_dumps=dumps))
+    r = await http.post('/json', json={'test': {'sd': 1233}})
+
+    assert r.json['request']['body'] == {'test': {'sd': 1233}}
+    assert r.json['request']['headers']['content-type'] == 'application/json'
+    assert r.json['request']['headers']['content-length'] == '20'
+    assert calls == {'loads': 1, 'dumps': 1}
+
+    assert await r.read_json() == r.json
+    assert calls == {'loads': 2, 'dumps': 1}
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_json_orjson():
+    orjson = pytest.importorskip('orjson')
+
+    http = Http(host=ECHO_URL, option=Options(json_loads=orjson.loads, json_dumps=orjson.dumps))
+    r = await http.post('/json', json={'test': [1, 2, 3]})
+
+    assert r.json['request']['body'] == {'test': [1, 2, 3]}
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_json_unexpected_content_type():
+    http = Http(host=ECHO_URL)
+
+    r = await http.get(q_params={'echo_body': 'hello'})
+    with pytest.raises(ContentTypeError):
+        r.json
+
+    r = await http.get(q_params={'echo_body': 'hello'}, o=Options(is_json=False))
+    assert r.body == b'hello'
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_json_lazy():
+    calls = []
+
+    def loads(value):
+        calls.append(value)
+        return json.loads(value)
+
+    http = Http(host=ECHO_URL, option=Options(json_loads=loads))
+
+    r = await http.get('/lazy')
+    assert r.code == 200
+    assert r.body
+    assert calls == []
+
+    assert r.json['http']['originalUrl'] == '/ping/lazy'
+    assert r.json is r.json
+    assert len(calls) == 1
+
+    await http.close()
+
+
+async def test_json_and_data():
+    http = Http(host=ECHO_URL)
+
+    with pytest.raises(ValueError):
+        await http.post(json={'a': 1}, data=b'1')
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_json_compressed():
+    http = Http(host=ECHO_URL, option=Options(compress='gzip', accept_encoding='gzip, deflate'))
+    payload = {'items': [{'id': i, 'name': 'item'} for i in range(1000)]}
+
+    r = await http.post(json=payload)
+    assert r.json['request']['headers']['content-encoding'] == 'gzip'
+    assert int(r.json['request']['headers']['content-length']) < len(json.dumps(payload)) // 5
+    assert r.json['request']['headers']['accept-encoding'] == 'gzip, deflate'
+    assert r.json['request']['body'] == payload
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_json_executor():
+    http = Http(host=ECHO_URL, option=Options(json_executor_size=0, is_json_dumps_in_executor=True))
+
+    r = await http.post(json={'a': 1})
+    # decoded when the body is read
+    assert r.__dict__['_json']['request']['body'] == {'a': 1}
+
+    await http.close()
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from aio_clients import AdaptiveLimiter, Http, Metrics, RateLimiter
+from aio_clients.exceptions import LoadShedError
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_rate_limiter():
+    http = Http(host=ECHO_URL, rate_limiter=RateLimiter(rate=20, burst=1, paths={'/ping/free': (1000, 1000)}))
+
+    start = time.monotonic()
+    r = await asyncio.gather(*[http.get('/free') for _ in range(10)])
+    assert [i.code for i in r] == [200] * 10
+    assert time.monotonic() - start < 0.2
+
+    start = time.monotonic()
+    r = await asyncio.gather(*[http.get() for _ in range(5)])
+    assert [i.code for i in r] == [200] * 5
+    assert time.monotonic() - start > 0.19
+    assert http.rate_limiter.throttled_requests == 4
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_adaptive_limiter():
+    metrics = Metrics()
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2, max_wait=0.5)
+    http = Http(host=ECHO_URL, concurrency_limiter=limiter, metrics=metrics)
+
+    start = time.monotonic()
+    r = await asyncio.gather(*[http.get(q_params={'echo_time': 100}) for _ in range(4)])
+    assert [i.code for i in r] == [200] * 4
+    # two waves of two requests
+    assert time.monotonic() - start > 0.19
+    assert limiter.waited_requests == 2
+    assert limiter.in_flight == 0
+    assert 'aio_clients_concurrency_limit 2' in metrics.prometheus()
+
+    limiter.max_wait = 0.05
+    r = await asyncio.gather(*[http.get(q_params={'echo_time': 100}) for _ in range(3)], return_exceptions=True)
+    assert sum(isinstance(i, LoadShedError) for i in r) == 1
+    assert limiter.shed == 1 and limiter.in_flight == 0
+
+    await http.close()
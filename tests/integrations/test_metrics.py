@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from aio_clients import Http, Metrics
+from aio_clients.struct import Middleware
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_metrics():
+    async def start(**kwargs):
+        pass
+
+    metrics = Metrics()
+    http = Http(host=ECHO_URL, metrics=metrics, middleware=Middleware(start=[start]))
+
+    for _ in range(3):
+        r = await http.post(json={'a': 1})
+        assert r.code == 200
+        assert r.json is not None
+    await http.get(q_params={'echo_code': 503})
+
+    post, get = sorted(metrics.endpoints(), key=lambda e: e.method, reverse=True)
+    assert post.host == ECHO_HOST
+    assert post.requests == 3
+    assert post.in_flight == 0
+    assert post.bytes_out > 0 and post.bytes_in > 0
+    assert post.total.count == post.ttfb.count == post.body.count == 3
+    assert post.json.count == 3
+    assert post.middleware.count == 3
+    assert get.codes == {503: 1}
+
+    # one connection is kept alive and reused
+    assert post.connect.count + get.connect.count == 1
+
+    await http.close()
+
+
+async def test_metrics_error():
+    metrics = Metrics()
+    http = Http(host='http://127.0.0.1:1/', metrics=metrics)
+
+    with pytest.raises(Exception):
+        await http.get()
+
+    [endpoint] = metrics.endpoints()
+    assert endpoint.errors == 1
+    assert endpoint.in_flight == 0
+    assert endpoint.connect.count == 0
+
+    await http.close()
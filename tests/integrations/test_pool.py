@@ -0,0 +1,50 @@
+import asyncio
+import os
+
+import pytest
+
+from aio_clients import Http, Options, Pool
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_pool_limit_per_host():
+    http = Http(host=ECHO_URL, option=Options(pool=Pool(limit=10, limit_per_host=2, keepalive_timeout=30)))
+
+    connector = http.session.connector
+    assert connector.limit == 10
+    assert connector.limit_per_host == 2
+
+    r = await asyncio.gather(*[http.get(q_params={'echo_time': 50}) for _ in range(4)])
+    assert [i.code for i in r] == [200] * 4
+
+    stats = http.pool_stats()
+    assert stats.limit == 10
+    assert stats.limit_per_host == 2
+    assert stats.acquired == 0
+    assert stats.idle == 2
+    assert sum(i.idle for i in stats.hosts.values()) == 2
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_pool_stats_acquired():
+    http = Http(host=ECHO_URL, option=Options(pool=Pool(force_close=True)))
+
+    tasks = [asyncio.ensure_future(http.get(q_params={'echo_time': 200})) for _ in range(3)]
+    await asyncio.sleep(0.1)
+
+    stats = http.pool_stats()
+    assert stats.acquired == 3
+    assert list(stats.hosts.values())[0].acquired == 3
+
+    await asyncio.gather(*tasks)
+
+    stats = http.pool_stats()
+    assert stats.acquired == 0
+    assert stats.idle == 0
+
+    await http.close()
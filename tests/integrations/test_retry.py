@@ -0,0 +1,128 @@
+import os
+
+import aiohttp
+import pytest
+from aiohttp import ClientConnectorError
+
+from aio_clients import Http, Options, Retry, RetryBudget
+from aio_clients.multipart import Easy, File
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+def counting_trace_config():
+    calls = []
+
+    async def on_request_start(session, trace_config_ctx, params):
+        calls.append(params.method)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    return calls, trace_config
+
+
+@pytest.mark.integtest
+async def test_retry_status():
+    calls, trace_config = counting_trace_config()
+    http = Http(
+        host=ECHO_URL,
+        option=Options(trace_config=trace_config, retry=Retry(attempts=3, backoff=0.01)),
+        retry_budget=RetryBudget(min_per_second=10),
+    )
+
+    r = await http.get(q_params={'echo_code': 503})
+    assert r.code == 503
+    assert calls == ['GET'] * 3
+
+    calls.clear()
+    r = await http.post(q_params={'echo_code': 503})
+    assert r.code == 503
+    assert calls == ['POST']
+
+    calls.clear()
+    r = await http.get(q_params={'echo_code': 500})
+    assert r.code == 500
+    assert calls == ['GET']
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_retry_after():
+    calls, trace_config = counting_trace_config()
+    http = Http(
+        host=ECHO_URL,
+        option=Options(trace_config=trace_config, retry=Retry(attempts=2, backoff=100)),
+        retry_budget=RetryBudget(min_per_second=10),
+    )
+
+    r = await http.get(q_params={'echo_code': 429, 'echo_header': 'Retry-After:0'})
+    assert r.code == 429
+    assert calls == ['GET'] * 2
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_retry_budget():
+    calls, trace_config = counting_trace_config()
+    budget = RetryBudget(ratio=0, min_per_second=0)
+    budget.tokens = 1
+    http = Http(
+        host=ECHO_URL,
+        option=Options(trace_config=trace_config, retry=Retry(attempts=5, backoff=0.01)),
+        retry_budget=budget,
+    )
+
+    await http.get(q_params={'echo_code': 503})
+    await http.get(q_params={'echo_code': 503})
+
+    assert calls == ['GET'] * 3
+    assert budget.exhausted == 2
+
+    await http.close()
+
+
+async def test_retry_connection_error():
+    calls, trace_config = counting_trace_config()
+    http = Http(
+        host='http://127.0.0.1:1/',
+        option=Options(trace_config=trace_config, retry=Retry(attempts=3, backoff=0.01)),
+        retry_budget=RetryBudget(min_per_second=10),
+    )
+
+    with pytest.raises(ClientConnectorError):
+        await http.get()
+    assert calls == ['GET'] * 3
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_retry_not_replayable_body():
+    calls, trace_config = counting_trace_config()
+    http = Http(
+        host=ECHO_URL,
+        option=Options(trace_config=trace_config, retry=Retry(attempts=3, backoff=0.01)),
+        retry_budget=RetryBudget(min_per_second=10),
+    )
+
+    async def chunks():
+        yield b'x' * 100
+
+    # the iterator is read by the first attempt, the next one would send nothing
+    with Easy('form-data') as form:
+        form.add_form(File(key='file', value=chunks(), file_name='file.bin', size=100))
+    r = await http.put(q_params={'echo_code': 503}, form=form)
+    assert r.code == 503
+    assert calls == ['PUT']
+
+    calls.clear()
+    with Easy('form-data') as form:
+        form.add_form(File(key='file', value=b'x' * 100, file_name='file.bin'))
+    r = await http.put(q_params={'echo_code': 503}, form=form)
+    assert r.code == 503
+    assert calls == ['PUT'] * 3
+
+    await http.close()
@@ -0,0 +1,169 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aio_clients import Http, Metrics, Options
+from aio_clients.session import registry
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_shared_session():
+    first = Http(host=ECHO_URL, option=Options(is_shared_session=True))
+    second = Http(host=ECHO_URL, option=Options(is_shared_session=True))
+    other = Http(host=ECHO_URL, option=Options(is_shared_session=True, is_ssl=None, session_kwargs={'cookies': {}}))
+
+    assert first.session is second.session
+    assert first.session is not other.session
+
+    r = await first.get()
+    assert r.code == 200
+
+    session = second.session
+    await first.close()
+    await first.close()
+    assert not session.closed
+
+    r = await second.get()
+    assert r.code == 200
+
+    await second.close()
+    await other.close()
+
+    # last user released the session, it lingers for the next user
+    assert not session.closed
+    third = Http(host=ECHO_URL, option=Options(is_shared_session=True))
+    assert third.session is session
+
+    await third.close()
+    await registry.close()
+    assert session.closed
+
+
+@pytest.mark.integtest
+async def test_shared_session_metrics():
+    metrics = Metrics()
+    plain = Http(host=ECHO_URL, option=Options(is_shared_session=True))
+    first = Http(host=ECHO_URL, option=Options(is_shared_session=True), metrics=metrics)
+    second = Http(host=ECHO_URL, option=Options(is_shared_session=True), metrics=metrics)
+
+    # a session without the trace config of metrics is not reused
+    assert first.session is not plain.session
+    assert first.session is second.session
+
+    r = await first.get()
+    assert r.code == 200
+    endpoint = metrics.endpoint('GET', ECHO_URL)
+    assert endpoint.connect.count == 1
+    assert endpoint.bytes_in > 0
+
+    await plain.close()
+    await first.close()
+    await second.close()
+    await registry.close()
+
+
+@pytest.mark.integtest
+async def test_shared_session_close(monkeypatch):
+    monkeypatch.setattr(registry, 'linger', 0)
+
+    http = Http(host=ECHO_URL, option=Options(is_shared_session=True, is_close_session=True))
+    session = http.session
+    r = await http.get()
+
+    assert r.code == 200
+    assert session.closed
+
+
+@pytest.mark.integtest
+async def test_shared_session_reacquire(monkeypatch):
+    monkeypatch.setattr(registry, 'linger', 0)
+
+    first = Http(host=ECHO_URL, option=Options(is_shared_session=True))
+    second = Http(host=ECHO_URL, option=Options(is_shared_session=True))
+    assert (await first.get()).code == 200
+    assert (await second.get()).code == 200
+
+    # first doesn't hold the session after close, second is the last user and the session is closed
+    session = first.session
+    await first.close()
+    await second.close()
+    assert session.closed
+
+    r = await first.get()
+    assert r.code == 200
+    assert first.session is not session
+
+    await first.close()
+    assert not first._sessions
+
+
+@pytest.mark.integtest
+async def test_close_session_in_flight():
+    http = Http(host=ECHO_URL, option=Options(is_close_session=True))
+    session = http.session
+
+    r = await asyncio.gather(
+        http.get(q_params={'echo_time': 10}),
+        http.get(q_params={'echo_time': 100}),
+        http.get(q_params={'echo_time': 200}),
+    )
+
+    assert [i.code for i in r] == [200] * 3
+    assert session.closed
+
+
+@pytest.mark.integtest
+async def test_session_context_manager():
+    async with Http(host=ECHO_URL) as http:
+        r = await http.get()
+        assert r.code == 200
+        session = http.session
+
+    assert session.closed
+
+    # closed Http makes a new session on the next request
+    r = await http.get()
+    assert r.code == 200
+    assert http.session is not session
+    await http.close()
+
+
+@pytest.mark.integtest
+def test_session_per_loop():
+    # configured at import time, without running loop
+    http = Http(host=ECHO_URL)
+    assert not http._sessions
+
+    async def main():
+        r = await http.get()
+        session = http.session
+        await http.close()
+        return r.code, session
+
+    first = asyncio.run(main())
+    second = asyncio.run(main())
+
+    assert first[0] == second[0] == 200
+    assert first[1] is not second[1]
+
+
+@pytest.mark.integtest
+def test_session_per_thread():
+    http = Http(host=ECHO_URL)
+
+    async def main():
+        r = await asyncio.gather(*[http.get() for _ in range(5)])
+        session = http.session
+        await http.close()
+        return [i.code for i in r], session
+
+    with ThreadPoolExecutor(2) as pool:
+        result = list(pool.map(lambda _: asyncio.run(main()), range(2)))
+
+    assert result[0][0] == result[1][0] == [200] * 5
+    assert result[0][1] is not result[1][1]
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import aiohttp
+import pytest
+
+from aio_clients import Http, Options
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_single_flight():
+    calls = []
+
+    async def on_request_start(session, trace_config_ctx, params):
+        calls.append(str(params.url))
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+
+    http = Http(host=ECHO_URL, option=Options(trace_config=trace_config), is_single_flight=True)
+
+    q_params = {'echo_time': 100}
+    r = await asyncio.gather(
+        *[http.get('/flight', q_params=q_params) for _ in range(5)],
+        http.get('/flight', q_params=q_params, headers={'X-Token': '1'}),
+        http.get('/other', q_params=q_params),
+        http.post('/flight', q_params=q_params),
+    )
+
+    assert len(calls) == 4
+    assert all(i is r[0] for i in r[:5])
+    assert r[5] is not r[0]
+    assert r[5].json['request']['headers']['x-token'] == '1'
+
+    # nothing is in flight, the next call makes a new request
+    again = await http.get('/flight', q_params=q_params)
+    assert again is not r[0]
+    assert len(calls) == 5
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_single_flight_cancel():
+    http = Http(host=ECHO_URL, is_single_flight=True)
+
+    first = asyncio.ensure_future(http.get(q_params={'echo_time': 100}))
+    second = asyncio.ensure_future(http.get(q_params={'echo_time': 100}))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+    r = await second
+    assert r.code == 200
+
+    await http.close()
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from aio_clients import Http, Options
+from aio_clients.struct import Middleware
+
+ECHO_HOST = os.getenv('ECHO_HOST', 'localhost:8081')
+ECHO_URL = f'http://{ECHO_HOST}/ping'
+
+
+@pytest.mark.integtest
+async def test_stream():
+    http = Http(host=ECHO_URL, option=Options(chunk_size=16))
+
+    async with http.stream(method='GET', path='/stream') as r:
+        assert r.code == 200
+        assert r.json is None
+
+        chunks = [chunk async for chunk in r.body]
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 16 for chunk in chunks)
+    assert b''.join(chunks).startswith(b'{')
+
+    r = await http.get('/stream')
+    assert r.json['http']['originalUrl'] == '/ping/stream'
+
+    await http.close()
+
+
+@pytest.mark.integtest
+async def test_stream_middleware_end():
+    data = {}
+
+    async def middleware_end(response, **kwargs):
+        data['code'] = response.code
+
+    http = Http(host=ECHO_URL, middleware=Middleware(end=[middleware_end]))
+
+    async with http.stream(method='GET') as r:
+        assert data['code'] == 200
+        response = r.response
+
+    assert response.closed
+
+    await http.close()
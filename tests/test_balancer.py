@@ -0,0 +1,199 @@
+import socket
+from collections import Counter
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from aio_clients import Balancer, Http, Metrics, Options, Retry, RetryBudget
+from aio_clients.balancer import LEAST_IN_FLIGHT, P2C_EWMA
+
+HOSTS = ['http://a:8080/api', 'http://b:8080/api', 'http://c:8080/api']
+
+
+def test_balancer_round_robin():
+    balancer = Balancer(HOSTS)
+    assert [balancer.pick().url for _ in range(4)] == HOSTS + HOSTS[:1]
+
+    a = balancer.upstreams[0]
+    assert balancer.pick([a]).url != a.url
+    assert balancer.pick(balancer.upstreams) is None
+
+
+def test_balancer_url():
+    balancer = Balancer(HOSTS)
+    b = balancer.upstreams[1]
+    assert balancer.url(b, 'http://a:8080/api/users?id=1') == 'http://b:8080/api/users?id=1'
+    assert balancer.url(b, 'http://other/users') == 'http://other/users'
+
+
+def test_balancer_least_in_flight():
+    balancer = Balancer(HOSTS, strategy=LEAST_IN_FLIGHT)
+    a, b, c = balancer.upstreams
+    balancer.begin(a)
+    balancer.begin(c)
+    assert {balancer.pick() for _ in range(10)} == {b}
+
+
+def test_balancer_p2c_ewma():
+    balancer = Balancer(HOSTS[:2], strategy=P2C_EWMA)
+    a, b = balancer.upstreams
+    balancer.record(a, 0.5, False)
+    balancer.record(b, 0.01, False)
+    assert Counter(balancer.pick() for _ in range(10)) == {b: 10}
+
+    # peak EWMA: a slow response is seen at once
+    balancer.record(b, 1, False)
+    assert b.ewma == 1
+
+
+def test_balancer_eject():
+    balancer = Balancer(HOSTS, eject_failures=2, eject_time=60, max_ejected=0.5)
+    a, b, c = balancer.upstreams
+
+    balancer.record(a, 0.1, True)
+    balancer.record(a, 0.1, False)
+    balancer.record(a, 0.1, True)
+    assert not a.is_ejected(a.updated_at)
+
+    balancer.record(a, 0.1, True)
+    assert balancer.snapshot()[a.url]['is_ejected']
+    assert a not in {balancer.pick() for _ in range(10)}
+
+    # not more than half of hosts
+    for _ in range(2):
+        balancer.record(b, 0.1, True)
+    assert not balancer.snapshot()[b.url]['is_ejected']
+
+    # all hosts are ejected or excluded: ejected ones are used anyway
+    assert balancer.pick([b, c]) is a
+
+
+def test_balancer_params():
+    with pytest.raises(ValueError):
+        Balancer([])
+    with pytest.raises(ValueError):
+        Balancer(HOSTS, strategy='random')
+
+
+def free_url() -> str:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{s.getsockname()[1]}'
+
+
+@pytest.fixture
+async def servers():
+    async def ok(request: web.Request) -> web.Response:
+        return web.json_response({'server': 'ok', 'path': request.path})
+
+    async def unavailable(request: web.Request) -> web.Response:
+        return web.json_response({'server': 'unavailable'}, status=503)
+
+    ok_app, unavailable_app = web.Application(), web.Application()
+    ok_app.router.add_route('*', '/{tail:.*}', ok)
+    unavailable_app.router.add_route('*', '/{tail:.*}', unavailable)
+    async with TestServer(ok_app) as ok_server, TestServer(unavailable_app) as unavailable_server:
+        yield str(ok_server.make_url('')).rstrip('/'), str(unavailable_server.make_url('')).rstrip('/')
+
+
+async def test_balancer_failover(servers):
+    ok, unavailable = servers
+    http = Http(
+        balancer=Balancer([unavailable, free_url(), ok], failover=2), retry_budget=RetryBudget(min_per_second=10),
+    )
+
+    # 503 and connection error
+    balancer = http.balancer
+    balancer._next = 1
+    r = await http.get('/users')
+    assert r.code == 200
+    assert r.json == {'server': 'ok', 'path': '/users'}
+    assert [u.requests for u in balancer.upstreams] == [1, 1, 1]
+    assert [u.errors for u in balancer.upstreams] == [1, 1, 0]
+    await http.close()
+
+    # not idempotent requests are not sent again
+    http = Http(host=[unavailable, ok])
+    r = await http.post('/users')
+    assert r.code == 503
+    assert [u.requests for u in http.balancer.upstreams] == [1, 0]
+    await http.close()
+
+
+async def test_balancer_retry(servers):
+    ok, unavailable = servers
+    http = Http(host=[unavailable, ok], option=Options(retry=Retry(attempts=2, backoff=0)))
+    http.balancer.failover = 0
+
+    r = await http.get('/users')
+    assert r.code == 200
+    assert [u.requests for u in http.balancer.upstreams] == [1, 1]
+
+    await http.close()
+
+
+async def test_balancer_last_response(servers):
+    _, unavailable = servers
+    http = Http(host=[unavailable, unavailable + '/'])
+
+    r = await http.get('/users')
+    assert r.code == 503
+    assert r.json == {'server': 'unavailable'}
+
+    await http.close()
+
+
+async def test_balancer_round_robin_requests():
+    def handler(name: int):
+        async def handle(request: web.Request) -> web.Response:
+            return web.json_response({'server': name})
+        return handle
+
+    servers = []
+    for i in range(4):
+        app = web.Application()
+        app.router.add_get('/', handler(i))
+        servers.append(TestServer(app))
+    for server in servers:
+        await server.start_server()
+
+    try:
+        http = Http(host=[str(server.make_url('')).rstrip('/') for server in servers])
+        served = Counter()
+        for _ in range(40):
+            served[(await http.get('/')).json['server']] += 1
+        assert served == {0: 10, 1: 10, 2: 10, 3: 10}
+        await http.close()
+    finally:
+        for server in servers:
+            await server.close()
+
+
+async def test_balancer_metrics_per_upstream():
+    async def handle(request: web.Request) -> web.Response:
+        return web.json_response({'ok': True})
+
+    servers = []
+    for _ in range(2):
+        app = web.Application()
+        app.router.add_get('/', handle)
+        servers.append(TestServer(app))
+    for server in servers:
+        await server.start_server()
+
+    try:
+        metrics = Metrics()
+        http = Http(host=[str(server.make_url('')).rstrip('/') for server in servers], metrics=metrics)
+        for _ in range(4):
+            assert (await http.get('/')).json == {'ok': True}
+        await http.close()
+
+        for server in servers:
+            endpoint = metrics.endpoint('GET', str(server.make_url('')))
+            assert endpoint.requests == 2
+            assert endpoint.body.count == 2
+            assert endpoint.json.count == 2
+    finally:
+        for server in servers:
+            await server.close()
@@ -0,0 +1,86 @@
+import pytest
+
+from aio_clients import CircuitBreaker
+from aio_clients.breaker import CLOSED, HALF_OPEN, OPEN
+from aio_clients.exceptions import CircuitOpenError
+
+URL = 'http://a.com/path'
+
+
+def test_breaker_failure_rate():
+    breaker = CircuitBreaker(window=10, min_calls=4, failure_rate=0.5, open_timeout=60)
+    circuit = breaker.circuit(URL)
+
+    for is_failure in (False, True, False):
+        circuit.before()
+        circuit.record(0.1, is_failure)
+    assert breaker.state(URL) == CLOSED
+
+    circuit.before()
+    circuit.record(0.1, True)
+    assert breaker.state(URL) == OPEN
+    assert breaker.state('http://b.com/') == CLOSED
+
+    with pytest.raises(CircuitOpenError) as e:
+        circuit.before()
+    assert e.value.host == 'a.com'
+    assert 59 < e.value.retry_after <= 60
+
+
+def test_breaker_sliding_window():
+    breaker = CircuitBreaker(window=4, min_calls=4, failure_rate=0.5)
+    circuit = breaker.circuit(URL)
+
+    for is_failure in (True, False, False, False, False, True, False, False):
+        circuit.record(0.1, is_failure)
+    assert circuit.failures == 1
+    assert circuit.failure_rate == 0.25
+    assert circuit.state == CLOSED
+
+
+def test_breaker_slow_calls():
+    breaker = CircuitBreaker(window=10, min_calls=2, slow_call=1, slow_rate=1)
+    circuit = breaker.circuit(URL)
+
+    circuit.record(2, False)
+    circuit.record(0.5, False)
+    assert circuit.state == CLOSED
+    circuit.record(2, False)
+    circuit.record(2, False)
+    assert circuit.state == CLOSED
+
+    breaker = CircuitBreaker(window=2, min_calls=2, slow_call=1, slow_rate=1)
+    circuit = breaker.circuit(URL)
+    circuit.record(2, False)
+    circuit.record(3, False)
+    assert circuit.state == OPEN
+
+
+def test_breaker_half_open():
+    breaker = CircuitBreaker(window=2, min_calls=1, open_timeout=0, half_open_calls=2)
+    circuit = breaker.circuit(URL)
+
+    circuit.record(0.1, True)
+    assert circuit.state == OPEN
+
+    circuit.before()
+    assert circuit.state == HALF_OPEN
+    circuit.before()
+    with pytest.raises(CircuitOpenError):
+        circuit.before()
+
+    circuit.cancel()
+    circuit.before()
+
+    circuit.record(0.1, False)
+    assert circuit.state == HALF_OPEN
+    circuit.record(0.1, False)
+    assert circuit.state == CLOSED
+
+    circuit.record(0.1, True)
+    assert circuit.state == OPEN
+    circuit.before()
+    circuit.record(0.1, True)
+    assert circuit.state == OPEN
+
+    assert breaker.snapshot() == {'a.com': {'state': OPEN, 'calls': 0, 'failure_rate': 0.0, 'slow_rate': 0.0}}
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import time
+from email.utils import formatdate
+
+import pytest
+from multidict import CIMultiDict
+
+from aio_clients import Options
+from aio_clients.cache import BaseCache, CacheEntry, FileCache, MemoryCache, cache_key, expires_at, is_cacheable_request
+from tests.conftest import make_response
+
+NOW = 1_000_000.0
+
+
+def headers(**kwargs):
+    return CIMultiDict({k.replace('_', '-'): v for k, v in kwargs.items()})
+
+
+def test_cache_key():
+    assert cache_key('get', 'http://a.com/x') == 'GET http://a.com/x'
+    assert cache_key('GET', 'http://a.com/x', {'a': 1, 'b': 'c'}) == 'GET http://a.com/x?a=1&b=c'
+    assert cache_key('GET', 'http://a.com/x?z=1', [('a', 1), ('a', 2)]) == 'GET http://a.com/x?z=1&a=1&a=2'
+
+
+def test_expires_at():
+    assert expires_at(200, headers(Cache_Control='max-age=60'), NOW) == NOW + 60
+    assert expires_at(200, headers(Cache_Control='public, max-age=60', Age='10'), NOW) == NOW + 50
+    assert expires_at(200, headers(Cache_Control='no-store, max-age=60'), NOW) is None
+    assert expires_at(200, headers(Cache_Control='no-cache', ETag='"1"'), NOW) == NOW
+    assert expires_at(200, headers(Cache_Control='no-cache'), NOW) is None
+    assert expires_at(200, headers(Cache_Control='max-age=60', Vary='*'), NOW) is None
+    assert expires_at(200, headers(Cache_Control='private, max-age=60'), NOW) is None
+    assert expires_at(206, headers(Cache_Control='max-age=60'), NOW) is None
+    assert expires_at(304, headers(Cache_Control='max-age=60', ETag='"1"'), NOW) is None
+    assert expires_at(200, headers(Cache_Control='max-age=60, s-maxage=10'), NOW) == NOW + 10
+
+    assert expires_at(200, headers(
+        Expires=formatdate(NOW + 30, usegmt=True), Date=formatdate(NOW, usegmt=True)
+    ), NOW) == NOW + 30
+    assert expires_at(200, headers(Expires='0'), NOW) == NOW
+
+    assert expires_at(200, headers(ETag='"1"'), NOW) == NOW
+    assert expires_at(200, headers(Last_Modified=formatdate(NOW, usegmt=True)), NOW) == NOW
+    assert expires_at(500, headers(ETag='"1"'), NOW) is None
+    assert expires_at(200, headers(), NOW) is None
+
+
+def test_cache_entry():
+    entry = CacheEntry.from_response(
+        make_response(headers={'Cache-Control': 'max-age=60', 'ETag': '"abc"', 'Vary': 'Accept-Language'}),
+        {'accept-language': 'en'},
+        now=NOW,
+    )
+
+    assert entry.is_fresh(NOW + 59)
+    assert not entry.is_fresh(NOW + 60)
+    assert entry.is_match({'Accept-Language': 'en'})
+    assert not entry.is_match({'Accept-Language': 'ru'})
+    assert entry.validators() == {'If-None-Match': '"abc"'}
+
+    assert entry.refresh({'Cache-Control': 'max-age=120', 'Content-Length': '0'}, now=NOW + 100)
+    assert entry.expires_at == NOW + 220
+    assert 'Content-Length' not in entry.to_response(Options()).headers
+    assert entry.to_response(Options()).headers['Cache-Control'] == 'max-age=120'
+
+    res = entry.to_response(Options())
+    assert res.is_cached
+    assert res.body == b'{"a": 1}'
+    assert res.json == {'a': 1}
+
+    assert not entry.refresh({'Cache-Control': 'no-store'})
+    assert CacheEntry.from_response(make_response(), {}) is None
+
+
+def test_is_cacheable_request():
+    assert is_cacheable_request({'Accept': 'application/json'})
+    assert not is_cacheable_request({'Range': 'bytes=0-10'})
+    assert not is_cacheable_request({'if-none-match': '"1"'})
+    assert not is_cacheable_request({'If-Modified-Since': formatdate(NOW, usegmt=True)})
+
+
+def test_cache_entry_authorization():
+    auth = {'Authorization': 'Bearer user-a'}
+    private = make_response(headers={'Cache-Control': 'max-age=60'})
+    assert CacheEntry.from_response(private, auth, now=NOW) is None
+    assert CacheEntry.from_response(private, {'authorization': 'x'}, now=NOW) is None
+
+    for cache_control in ('public, max-age=60', 'max-age=60, must-revalidate', 's-maxage=60'):
+        res = make_response(headers={'Cache-Control': cache_control})
+        assert CacheEntry.from_response(res, auth, now=NOW) is not None
+
+
+def test_base_cache_is_abstract():
+    with pytest.raises(TypeError):
+        BaseCache()  # type: ignore
+
+
+async def test_memory_cache_lru():
+    cache = MemoryCache(max_entries=2, max_bytes=10)
+
+    def entry(body):
+        return CacheEntry(code=200, headers=[], body=body, expires_at=time.time() + 60)
+
+    await cache.set('a', entry(b'123'))
+    await cache.set('b', entry(b'123'))
+    assert await cache.get('a')
+
+    await cache.set('c', entry(b'123'))
+    assert len(cache) == 2
+    assert await cache.get('b') is None
+    assert cache.size == 6
+
+    await cache.set('d', entry(b'12345678'))
+    assert len(cache) == 1
+    assert cache.size == 8
+
+    await cache.set('e', entry(b'12345678901'))
+    assert await cache.get('e') is None
+
+    await cache.delete('d')
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+async def test_file_cache(tmp_path):
+    cache = FileCache(str(tmp_path))
+    entry = CacheEntry(code=200, headers=[('ETag', '"1"')], body=b'body', expires_at=NOW, is_json=True, json={'a': 1})
+
+    assert await cache.get('a') is None
+    await cache.set('a', entry)
+    assert await cache.get('a') == entry
+    await cache.delete('a')
+    assert await cache.get('a') is None
+    await cache.delete('a')
+
+
+async def test_file_cache_concurrent_set(tmp_path):
+    cache = FileCache(str(tmp_path))
+    entries = [CacheEntry(code=200, headers=[], body=str(i).encode() * 10_000, expires_at=NOW) for i in range(8)]
+
+    for _ in range(20):
+        await asyncio.gather(*(cache.set('a', entry) for entry in entries))
+    assert await cache.get('a') in entries
+    assert os.listdir(str(tmp_path)) == [os.path.basename(cache._path('a'))]
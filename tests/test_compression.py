@@ -0,0 +1,112 @@
+import aiohttp
+import pytest
+
+from aio_clients import Http, Options, compression
+
+BODY = b'{"items": [' + b'{"id": 1, "name": "item"}, ' * 1000 + b'{}]}'
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate'])
+def test_compress(encoding):
+    data = compression.compress(encoding, BODY)
+    assert len(data) < len(BODY) // 10
+    assert compression.decompress(encoding, data) == BODY
+
+
+def test_compress_optional():
+    zstd = pytest.importorskip('zstandard')
+    data = compression.compress('zstd', BODY)
+    assert zstd.ZstdDecompressor().decompress(data) == BODY
+    assert 'zstd' in compression.accept_encoding()
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'deflate'])
+def test_decompressobj(encoding):
+    data = compression.compress(encoding, BODY)
+    decompressor = compression.decompressobj(encoding)
+    assert b''.join(decompressor.decompress(data[i:i + 100]) for i in range(0, len(data), 100)) == BODY
+
+
+def test_compress_unknown():
+    with pytest.raises(ValueError):
+        compression.compress('lzma', BODY)
+
+
+@pytest.mark.parametrize('size', [1024, 2 ** 18])
+async def test_http_compress(size):
+    http = Http(option=Options(compress='gzip'))
+    option = Options(compress='gzip', compress_executor_size=size)
+
+    _, headers, r = http._prepare(
+        path=None, headers=None, query_params=None, json={'a': 'b' * 2000}, data=None, form=None, option=option,
+    )
+    await http._compress(r, headers, 'gzip', option)
+
+    assert headers['Content-Encoding'] == 'gzip'
+    assert isinstance(r['data'], aiohttp.BytesPayload)
+    assert r['data'].content_type == 'application/json'
+
+    chunks = []
+    await r['data'].write(_Writer(chunks))
+    assert compression.decompress('gzip', b''.join(chunks)) == b'{"a": "' + b'b' * 2000 + b'"}'
+
+
+async def test_http_compress_small():
+    http = Http()
+    option = Options(compress='gzip')
+
+    _, headers, r = http._prepare(
+        path=None, headers=None, query_params=None, json=None, data=b'small', form=None, option=option,
+    )
+    await http._compress(r, headers, 'gzip', option)
+
+    assert 'Content-Encoding' not in headers
+    assert r['data'] == b'small'
+
+
+async def test_http_zstd_response():
+    zstd = pytest.importorskip('zstandard')
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def handler(request: web.Request) -> web.Response:
+        assert request.headers['Accept-Encoding'] == 'zstd'
+        return web.Response(
+            body=zstd.ZstdCompressor().compress(BODY),
+            headers={'Content-Encoding': 'zstd', 'Content-Type': 'application/json'},
+        )
+
+    app = web.Application()
+    app.router.add_get('/', handler)
+    async with TestServer(app) as server:
+        async with Http(host=str(server.make_url('/')), option=Options(accept_encoding='zstd')) as http:
+            r = await http.get()
+            assert r.body == BODY
+            assert len(r.json['items']) == 1001
+
+
+async def test_http_zstd_stream():
+    zstd = pytest.importorskip('zstandard')
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response(
+            body=zstd.ZstdCompressor().compress(BODY),
+            headers={'Content-Encoding': 'zstd', 'Content-Type': 'application/json'},
+        )
+
+    app = web.Application()
+    app.router.add_get('/', handler)
+    async with TestServer(app) as server:
+        async with Http(host=str(server.make_url('/')), option=Options(accept_encoding='zstd', chunk_size=100)) as http:
+            async with http.stream(method='GET') as r:
+                assert b''.join([chunk async for chunk in r.body]) == BODY
+
+
+class _Writer:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def write(self, chunk):
+        self.chunks.append(bytes(chunk))
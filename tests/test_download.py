@@ -0,0 +1,155 @@
+import hashlib
+import io
+import os
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from aio_clients import Http
+from aio_clients.exceptions import DownloadError
+
+DATA = os.urandom(300_000)
+SHA256 = 'sha256:' + hashlib.sha256(DATA).hexdigest()
+
+
+@pytest.fixture
+async def server(tmp_path):
+    source = tmp_path / 'source.bin'
+    source.write_bytes(DATA)
+    state = {'interrupt': 0, 'requests': []}
+
+    async def file(request: web.Request) -> web.StreamResponse:
+        state['requests'].append((request.method, request.headers.get('Range')))
+        if state['interrupt']:
+            # send half of the body and drop the connection
+            state['interrupt'] -= 1
+            response = web.StreamResponse(headers={'Content-Length': str(len(DATA)), 'ETag': state['etag']})
+            await response.prepare(request)
+            await response.write(DATA[:len(DATA) // 2])
+            assert request.transport is not None
+            request.transport.close()
+            return response
+        return web.FileResponse(source)
+
+    app = web.Application()
+    app.router.add_get('/file', file)
+    async with TestServer(app) as test_server:
+        http = Http(host=str(test_server.make_url('')))
+        r = await http.head('/file')
+        state['etag'] = r.headers['ETag']
+        state['requests'].clear()
+        yield http, state
+        await http.close()
+
+
+async def test_download(server, tmp_path):
+    http, state = server
+    dest = tmp_path / 'dest.bin'
+
+    r = await http.download('/file', dest, checksum=SHA256, chunk_size=2 ** 14)
+    assert r.is_ok and r.size == len(DATA) and not r.is_resumed
+    assert r.path == str(dest)
+    assert dest.read_bytes() == DATA
+    assert not os.path.exists(f'{dest}.part')
+
+
+async def test_download_to_file(server):
+    http, state = server
+    f = io.BytesIO()
+
+    r = await http.download('/file', f, is_write_in_thread=True)
+    assert r.size == len(DATA) and r.path is None
+    assert f.getvalue() == DATA
+
+
+async def test_download_resume(server, tmp_path):
+    http, state = server
+    dest = tmp_path / 'dest.bin'
+
+    # left by a previous call
+    with open(f'{dest}.part', 'wb') as f:
+        f.write(DATA[:1000])
+    with open(f'{dest}.part.validator', 'w') as f:
+        f.write(state['etag'])
+
+    r = await http.download('/file', dest, checksum=SHA256)
+    assert r.is_resumed
+    assert state['requests'] == [('GET', 'bytes=1000-')]
+    assert dest.read_bytes() == DATA
+    assert not os.path.exists(f'{dest}.part.validator')
+
+
+async def test_download_resume_changed(server, tmp_path):
+    http, state = server
+    dest = tmp_path / 'dest.bin'
+
+    with open(f'{dest}.part', 'wb') as f:
+        f.write(b'old content')
+    with open(f'{dest}.part.validator', 'w') as f:
+        # aiohttp server supports only dates in If-Range
+        f.write('Wed, 21 Oct 2015 07:28:00 GMT')
+
+    # If-Range doesn't match, the server sends the whole file
+    r = await http.download('/file', dest, checksum=SHA256)
+    assert r.code == 200 and not r.is_resumed
+    assert dest.read_bytes() == DATA
+
+
+async def test_download_interrupted(server, tmp_path):
+    http, state = server
+    state['interrupt'] = 1
+    dest = tmp_path / 'dest.bin'
+
+    r = await http.download('/file', dest, checksum=SHA256, o=http.base_option)
+    assert dest.read_bytes() == DATA
+    assert r.size == len(DATA)
+    assert state['requests'] == [('GET', None), ('GET', f'bytes={len(DATA) // 2}-')]
+
+
+async def test_download_parallel(server, tmp_path):
+    http, state = server
+    dest = tmp_path / 'dest.bin'
+
+    r = await http.download('/file', dest, checksum=SHA256, parts=3, chunk_size=2 ** 16, is_write_in_thread=True)
+    assert dest.read_bytes() == DATA
+    assert r.checksum == SHA256.split(':')[1]
+    assert sorted(state['requests'][1:]) == [
+        ('GET', 'bytes=0-99999'), ('GET', 'bytes=100000-199999'), ('GET', 'bytes=200000-299999'),
+    ]
+
+
+async def test_download_checksum_mismatch(server, tmp_path):
+    http, state = server
+    dest = tmp_path / 'dest.bin'
+
+    with pytest.raises(DownloadError):
+        await http.download('/file', dest, checksum='sha256:00')
+    assert not os.path.exists(dest)
+    assert not os.path.exists(f'{dest}.part')
+
+
+async def test_download_error_code(server, tmp_path):
+    http, state = server
+    dest = tmp_path / 'dest.bin'
+
+    r = await http.download('/missing', dest)
+    assert r.code == 404 and not r.is_ok
+    assert not os.path.exists(dest)
+
+
+async def test_download_checksum_format(server):
+    http, state = server
+
+    with pytest.raises(ValueError):
+        await http.download('/file', io.BytesIO(), checksum='sha256')
+
+
+async def test_download_error_code_no_part(server, tmp_path):
+    http, state = server
+    dest = tmp_path / 'dest.bin'
+
+    r = await http.download('/missing', dest, parts=3)
+    assert r.code == 404
+    assert not os.path.exists(f'{dest}.part')
+    assert not os.path.exists(f'{dest}.part.validator')
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from aio_clients import Http, Options, Hedge, RetryBudget
+from aio_clients.hedge import LatencyWindow
+
+
+def test_latency_window():
+    window = LatencyWindow(size=100, min_samples=10)
+    hedge = Hedge(percentile=0.9, max_delay=0.5)
+
+    for i in range(9):
+        window.record(i / 100)
+    assert window.percentile(0.5) is None
+    assert window.delay(hedge) == 0.5
+    assert window.delay(Hedge(delay=0.01)) == 0.01
+
+    window.record(0.09)
+    assert window.percentile(0.9) == 0.09
+    assert window.percentile(0.5) == 0.05
+
+    for _ in range(100):
+        window.record(10)
+    assert len(window) == 100
+    assert window.delay(hedge) == 0.5
+
+
+def fake_http(delays, **kwargs):
+    http = Http(host='http://localhost', hedge_budget=RetryBudget(ratio=1, min_per_second=0), **kwargs)
+    state = {'started': 0, 'cancelled': 0, 'finished': 0}
+    delays = iter(delays)
+
+    async def fetch(**kwargs):
+        state['started'] += 1
+        delay = next(delays)
+        try:
+            await asyncio.sleep(abs(delay))
+        except asyncio.CancelledError:
+            state['cancelled'] += 1
+            raise
+        if delay < 0:
+            raise ConnectionError(state['started'])
+        state['finished'] += 1
+        return delay
+
+    http._fetch = fetch
+    return http, state
+
+
+async def test_hedge_faster_wins():
+    http, state = fake_http([1, 0.01])
+
+    r = await http.get(o=Options(hedge=Hedge(delay=0.02)))
+
+    assert r == 0.01
+    assert state == {'started': 2, 'cancelled': 1, 'finished': 1}
+    assert len(http.latency) == 1
+
+
+async def test_hedge_not_needed():
+    http, state = fake_http([0.01])
+
+    r = await http.get(o=Options(hedge=Hedge(delay=0.1)))
+
+    assert r == 0.01
+    assert state == {'started': 1, 'cancelled': 0, 'finished': 1}
+
+
+async def test_hedge_error():
+    http, state = fake_http([-0.05, 0.2])
+    r = await http.get(o=Options(hedge=Hedge(delay=0.01)))
+    assert r == 0.2
+
+    http, state = fake_http([-0.05, -0.1, 1])
+    with pytest.raises(ConnectionError):
+        await http.get(o=Options(hedge=Hedge(delay=0.01)))
+    assert state['started'] == 2
+
+
+async def test_hedge_budget_and_methods():
+    http, state = fake_http([0.05, 0.01, 0.01])
+    http.hedge_budget = RetryBudget(ratio=0, min_per_second=0)
+
+    r = await http.get(o=Options(hedge=Hedge(delay=0.01)))
+    assert r == 0.05
+    assert state['started'] == 1
+    assert http.hedge_budget.exhausted == 1
+
+    http, state = fake_http([0.05, 0.01])
+    r = await http.post(o=Options(hedge=Hedge(delay=0.01)))
+    assert r == 0.05
+    assert state['started'] == 1
+
+    # PUT is idempotent, but the body is not sent concurrently by default
+    http, state = fake_http([0.05, 0.01])
+    r = await http.put(json={'a': 1}, o=Options(hedge=Hedge(delay=0.01, methods=frozenset({'PUT'}))))
+    assert r == 0.05
+    assert state['started'] == 1
+
+    http, state = fake_http([0.05, 0.01])
+    hedge = Hedge(delay=0.01, methods=frozenset({'PUT'}), is_hedge_body=True)
+    r = await http.put(json={'a': 1}, o=Options(hedge=hedge))
+    assert r == 0.01
+    assert state['started'] == 2
@@ -0,0 +1,57 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import pytest
+
+from aio_clients import Http, Options
+from tests.conftest import make_response
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls.append(fn)
+        return super().submit(fn, *args, **kwargs)
+
+
+async def test_read_json_executor():
+    executor = CountingExecutor()
+    option = Options(json_executor_size=10, executor=executor)
+
+    assert await make_response(b'{"a": 1}', option=option).read_json() == {'a': 1}
+    assert executor.calls == []
+
+    body = json.dumps({'items': list(range(100))}).encode()
+    assert await make_response(body, option=option).read_json() == {'items': list(range(100))}
+    assert executor.calls == [option.json_loads]
+
+    executor.shutdown()
+
+
+async def test_dumps_executor():
+    executor = CountingExecutor()
+    option = Options(is_json_dumps_in_executor=True, executor=executor)
+
+    assert await Http._dumps({'a': 1}, option) == b'{"a": 1}'
+    assert await Http._dumps(None, option) is None
+    assert executor.calls == [option.json_dumps]
+
+    executor.shutdown()
+
+
+async def test_process_executor():
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        option = Options(json_executor_size=0, is_json_dumps_in_executor=True, executor=executor)
+
+        body = await Http._dumps({'items': [1, 2]}, option)
+        assert await make_response(body, option=option).read_json() == {'items': [1, 2]}
+
+
+async def test_read_json_executor_content_type():
+    option = Options(json_executor_size=0)
+
+    with pytest.raises(Exception):
+        await make_response(b'<html></html>', content_type='text/html', option=option).read_json()
@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+import pytest
+
+from aio_clients import AdaptiveLimiter, RateLimiter
+from aio_clients.exceptions import LoadShedError
+from aio_clients.limiter import GRADIENT, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.09 < bucket.reserve() <= 0.1
+    assert 0.19 < bucket.reserve() <= 0.2
+
+    bucket.refund()
+    assert 0.19 < bucket.reserve() <= 0.2
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+
+
+def test_rate_limiter_buckets():
+    limiter = RateLimiter(rate=10, paths={'/search': (1, 1), '/search/fast': (100, 10)})
+
+    default = limiter.bucket('http://a.com/users/1')
+    assert limiter.bucket('http://a.com/') is default
+    assert limiter.bucket('http://b.com/users/1') is not default
+
+    search = limiter.bucket('http://a.com/search?q=1')
+    assert search.rate == 1
+    assert limiter.bucket('http://a.com/search/fast').rate == 100
+    assert limiter.bucket('http://a.com/searching') is search
+
+
+async def test_rate_limiter_acquire():
+    limiter = RateLimiter(rate=20, burst=2)
+
+    start = time.monotonic()
+    await asyncio.gather(*[limiter.acquire('http://a.com/') for _ in range(6)])
+    elapsed = time.monotonic() - start
+
+    # 2 from burst, 4 more at 20 per second
+    assert 0.18 < elapsed < 0.4
+    assert limiter.throttled_requests == 4
+    assert limiter.throttled_seconds > 0.4
+
+
+def test_adaptive_limiter_aimd():
+    limiter = AdaptiveLimiter(initial_limit=10, min_limit=2, max_limit=12, latency_threshold=1)
+
+    # not used limit doesn't grow
+    limiter.record(0.1)
+    assert limiter.limit == 10
+
+    limiter.in_flight = 10
+    for _ in range(10):
+        limiter.record(0.1)
+    assert 10.9 < limiter.limit < 11
+
+    limiter.record(0.1, is_drop=True)
+    assert 9.8 < limiter.limit < 9.9
+    limiter.record(2)
+    assert 8.8 < limiter.limit < 8.9
+
+    for _ in range(100):
+        limiter.record(0.1, is_drop=True)
+    assert limiter.limit == 2
+    assert limiter.snapshot()['limit'] == 2
+
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(initial_limit=0)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(algorithm='vegas')
+
+
+def test_adaptive_limiter_gradient():
+    limiter = AdaptiveLimiter(algorithm=GRADIENT, initial_limit=20)
+    limiter.in_flight = 20
+
+    for _ in range(50):
+        limiter.record(0.01)
+    assert limiter.limit > 40
+
+    # the server starts to queue requests
+    grown = limiter.limit
+    for _ in range(20):
+        limiter.record(0.1)
+    assert limiter.limit < grown / 2
+
+
+async def test_adaptive_limiter_queue():
+    limiter = AdaptiveLimiter(initial_limit=2)
+    await limiter.acquire()
+    await limiter.acquire()
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1 and not waiter.done()
+
+    limiter.release()
+    await waiter
+    assert limiter.in_flight == 2 and limiter.queued == 0
+    assert limiter.waited_requests == 1
+
+    # cancelled waiters leave the queue
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert limiter.queued == 0 and limiter.in_flight == 2
+
+
+async def test_adaptive_limiter_cancel_and_release():
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+    await limiter.acquire()
+
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # the waiter is taken from the queue by release before its cancellation is handled
+    waiter.cancel()
+    limiter.release()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.queued == 0 and limiter.in_flight == 0
+
+    await limiter.acquire()
+    assert limiter.in_flight == 1
+
+
+async def test_adaptive_limiter_shed():
+    limiter = AdaptiveLimiter(initial_limit=1, max_wait=0.05, max_queue=1)
+    await limiter.acquire()
+
+    first = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(LoadShedError) as e:
+        await limiter.acquire()
+    assert e.value.limit == 1 and e.value.queued == 1
+
+    with pytest.raises(LoadShedError):
+        await first
+    assert limiter.shed == 2
+    assert limiter.queued == 0 and limiter.in_flight == 1
+
+    # no waiting at all
+    limiter = AdaptiveLimiter(initial_limit=1, max_wait=0)
+    await limiter.acquire()
+    with pytest.raises(LoadShedError):
+        await limiter.acquire()
@@ -0,0 +1,50 @@
+import pytest
+
+from aio_clients.metrics import Histogram, Metrics
+
+
+def test_histogram():
+    h = Histogram()
+    assert h.percentile(0.5) == 0.0
+
+    for i in range(1, 1001):
+        h.record(i / 1000)
+
+    assert h.count == 1000
+    assert h.max == 1.0
+    assert h.mean == pytest.approx(0.5005)
+    # buckets are at most 1/16 wide
+    assert h.percentile(0.5) == pytest.approx(0.5, rel=1 / 16)
+    assert h.percentile(0.99) == pytest.approx(0.99, rel=1 / 16)
+    assert h.percentile(1) == 1.0
+
+
+def test_histogram_bounds():
+    h = Histogram()
+    h.record(0)
+    h.record(10 ** 6)
+    assert h.percentile(0.5) == 1e-6
+    assert h.percentile(1) == 10 ** 6
+
+
+def test_metrics_export():
+    metrics = Metrics()
+    attempt = metrics.begin('get', 'http://localhost:8081/ping')
+    assert metrics.endpoint('GET', 'http://localhost:8081/other').in_flight == 1
+
+    metrics.headers(attempt, 200)
+    metrics.end(attempt, ValueError())
+
+    [item] = metrics.snapshot()
+    assert item['host'] == 'localhost:8081'
+    assert item['method'] == 'GET'
+    assert item['in_flight'] == 0
+    assert item['errors'] == 1
+    assert item['codes'] == {200: 1}
+    assert item['total']['count'] == 1
+    assert item['dns']['count'] == 0
+
+    text = metrics.prometheus()
+    assert 'aio_clients_requests_total{host="localhost:8081",method="GET"} 1' in text
+    assert 'aio_clients_responses_total{host="localhost:8081",method="GET",code="200"} 1' in text
+    assert 'aio_clients_total_seconds_count{host="localhost:8081",method="GET"} 1' in text
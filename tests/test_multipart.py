@@ -1,3 +1,5 @@
+import mmap
+
 from aio_clients.multipart import Easy, Form, File, Writer
 
 
@@ -33,3 +35,44 @@ hello world file\r
 
     assert dict(form.headers) == {'Content-Type': f'multipart/form-data; boundary={form.boundary}'}
     assert writer.buffer.decode() == raw_body
+
+
+async def test_file_stream(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(b'a' * 100_000)
+
+    async def chunks():
+        yield b'hello '
+        yield b'iterator'
+
+    with open(path, 'rb') as mapped, mmap.mmap(mapped.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        with Easy('form-data') as form:
+            form.add_form(File(key='path', value=path, file_name='data.bin'))
+            form.add_form(File(key='mmap', value=m, file_name='data.bin'))
+            form.add_form(File(key='iterator', value=chunks(), file_name='data.txt', size=14))
+
+        assert form.size is not None
+
+        writer = Writer()
+        await form.write(writer)
+
+    assert len(writer.buffer) == form.size
+    assert writer.buffer.count(b'Content-Length: 100000\r\n') == 2
+    assert b'Content-Length: 14\r\n' in writer.buffer
+    assert b'\r\n\r\nhello iterator\r\n' in writer.buffer
+    assert writer.buffer.count(b'a' * 100_000) == 2
+
+    # path is opened on every write
+    writer = Writer()
+    await form._parts[0][0].write(writer)
+    assert writer.buffer == b'a' * 100_000
+
+
+async def test_file_stream_without_size():
+    async def chunks():
+        yield b'hello'
+
+    with Easy('form-data') as form:
+        form.add_form(File(key='iterator', value=chunks(), file_name='data.txt'))
+
+    assert form.size is None
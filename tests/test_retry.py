@@ -0,0 +1,55 @@
+import time
+from email.utils import formatdate
+
+import aiohttp
+
+from aio_clients import Retry, RetryBudget
+from aio_clients.retry import parse_retry_after
+
+
+def test_retry_delay():
+    retry = Retry(backoff=1, backoff_max=5)
+
+    for attempt, limit in ((1, 1), (2, 2), (3, 4), (4, 5), (10, 5)):
+        for _ in range(50):
+            assert 0 <= retry.delay(attempt) <= limit
+
+    assert retry.delay(1, retry_after=3) == 3
+    assert retry.delay(1, retry_after=600) == 60
+    assert Retry(is_retry_after=False, backoff=0).delay(1, retry_after=3) == 0
+
+
+def test_retry_method_and_exception():
+    retry = Retry()
+
+    assert retry.is_retryable_method('get')
+    assert retry.is_retryable_method('PUT')
+    assert not retry.is_retryable_method('POST')
+    assert Retry(methods=frozenset({'POST'})).is_retryable_method('POST')
+
+    assert retry.is_retryable_exception(aiohttp.ServerDisconnectedError())
+    assert not retry.is_retryable_exception(ValueError())
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('12') == 12
+    assert parse_retry_after('soon') is None
+    assert 28 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2)
+    budget.tokens = 0
+
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
+    assert budget.exhausted == 2
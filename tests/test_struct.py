@@ -0,0 +1,50 @@
+import pytest
+from aiohttp import ClientTimeout
+
+from aio_clients import Options, CompactResponse
+from tests.conftest import make_response
+
+
+def test_options_request_base():
+    option = Options(request_kwargs={'allow_redirects': False})
+
+    base = option.request_base()
+    assert base == {'timeout': ClientTimeout(10), 'ssl': True, 'allow_redirects': False}
+    assert option.request_base() is base
+
+    option.is_ssl = None
+    assert option.request_base() == {'timeout': ClientTimeout(10), 'allow_redirects': False}
+    assert option.request_base() is not base
+
+
+HEADERS = {'ETag': '"1"', 'X-Request-Id': 'abc'}
+
+
+def test_compact_response():
+    r = make_response(headers=HEADERS).compact(headers=['etag'])
+
+    assert isinstance(r, CompactResponse)
+    assert not hasattr(r, '__dict__')
+    assert dict(r.headers) == {'ETag': '"1"'}
+    assert r.body == b'{"a": 1}'
+    assert r.json == {'a': 1}
+
+    assert r.drop_body() is r
+    assert r.body is None
+    assert r.json == {'a': 1}
+
+
+def test_compact_response_json():
+    # already decoded json is reused
+    res = make_response(headers=HEADERS)
+    assert res.json == {'a': 1}
+    r = res.compact(is_body=False)
+    assert r.body is None and r.json is res.json
+    assert len(r.headers) == 3
+
+    assert make_response(b'<html>', content_type='text/html').compact().json is None
+    assert make_response(option=Options(is_json=False)).compact().json is None
+
+    r = make_response(b'{"a"').compact()
+    with pytest.raises(ValueError):
+        r.drop_body()